@@ -0,0 +1,275 @@
+"""Measurement helpers shared by the MQTT and Solace load test scripts (standard library only).
+
+mqtt/mqtt_metrics.py and solace/smf/smf_metrics.py re-export these, so scripts keep
+importing from their own directory's helper module, e.g.:
+
+    from smf_metrics import LatencyHistogram, RatePacer, StatsReporter
+"""
+
+import random
+import threading
+import time
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of nanosecond values with constant memory and O(1) record.
+
+    Each power of two is split into 2**SUB_BITS linear sub-buckets, so any recorded
+    value is reported to within ~1.6%. Values beyond MAX_BITS (~4.9 hours) land in
+    the last bucket; the exact maximum is tracked separately.
+    """
+
+    SUB_BITS = 6
+    MAX_BITS = 44
+
+    def __init__(self):
+        self.sub_count = 1 << self.SUB_BITS
+        self.counts = [0] * ((self.MAX_BITS - self.SUB_BITS + 1) * self.sub_count)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - 1 - self.SUB_BITS
+        index = (shift + 1) * self.sub_count + (value >> shift) - self.sub_count
+        return min(index, len(self.counts) - 1)
+
+    def _bucket_value(self, index):
+        # Midpoint of the bucket's value range
+        if index < self.sub_count:
+            return index
+        shift = index // self.sub_count - 1
+        lower = (self.sub_count + index % self.sub_count) << shift
+        return lower + ((1 << shift) >> 1)
+
+    def record(self, value):
+        value = max(int(value), 0)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * p // 100))  # ceil
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(max(self._bucket_value(i), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def summary(self, scale=1e6):
+        """Count, min/mean/max and percentiles, scaled from ns (default: to ms)."""
+        result = {
+            "count": self.count,
+            "min": (self.min or 0) / scale,
+            "mean": self.mean() / scale,
+            "max": self.max / scale,
+        }
+        for p in PERCENTILES:
+            result[f"p{p:g}"] = self.percentile(p) / scale
+        return result
+
+    def format(self, scale=1e6, unit="ms"):
+        s = self.summary(scale)
+        parts = [f"{key}={s[key]:.3f}" for key in s if key != "count"]
+        return f"count={s['count']} " + " ".join(parts) + f" ({unit})"
+
+
+class SequenceTracker:
+    """Counts lost, duplicate and reordered messages per publisher from stamped sequences.
+
+    For each publisher only the highest sequence seen and a WINDOW-bit bitmap of the
+    sequences just below it are kept, so memory is bounded and record() is O(1). A
+    jump ahead counts the skipped sequences as lost until one of them shows up inside
+    the window, when it is reclassified as reordered; a sequence seen twice is a
+    duplicate. Arrivals older than the window are counted as too_old, except a
+    sequence of 0 or 1, which means the publisher restarted.
+    """
+
+    WINDOW = 1024
+    KEYS = ("received", "lost", "duplicates", "reordered", "too_old", "restarts")
+
+    def __init__(self):
+        self.mask = (1 << self.WINDOW) - 1
+        self.publishers = {}  # publisher -> [highest, bitmap, *counts in KEYS order]
+
+    def record(self, publisher, seq):
+        state = self.publishers.get(publisher)
+        if state is None:
+            self.publishers[publisher] = [seq, 1, 1, 0, 0, 0, 0, 0]
+            return
+        highest = state[0]
+        if seq > highest:
+            jump = seq - highest
+            state[3] += jump - 1
+            state[1] = 1 if jump >= self.WINDOW else ((state[1] << jump) | 1) & self.mask
+            state[0] = seq
+        elif highest - seq >= self.WINDOW:
+            if seq in (0, 1):
+                # Publisher restarted its sequence: start a fresh window
+                state[0], state[1] = seq, 1
+                state[7] += 1
+            else:
+                state[6] += 1
+        else:
+            bit = 1 << (highest - seq)
+            if state[1] & bit:
+                state[4] += 1
+            else:
+                state[1] |= bit
+                state[3] -= 1
+                state[5] += 1
+        state[2] += 1
+
+    def totals(self):
+        result = dict.fromkeys(self.KEYS, 0)
+        for state in self.publishers.values():
+            for key, count in zip(self.KEYS, state[2:]):
+                result[key] += count
+        result["publishers"] = len(self.publishers)
+        return result
+
+    def per_publisher(self):
+        # Integer ids (MQTT payload headers) are shown as hex, string ids as they are
+        return {
+            f"{publisher:08x}" if isinstance(publisher, int) else str(publisher): dict(
+                zip(("highest_seq",) + self.KEYS, [state[0]] + state[2:])
+            )
+            for publisher, state in self.publishers.items()
+        }
+
+    def format(self):
+        return " ".join(f"{key}={value}" for key, value in self.totals().items())
+
+
+class RatePacer:
+    """Paces a publish loop to `rate` msgs/sec against a fixed timeline.
+
+    Send i is due at start + i / rate (or after exponential gaps when poisson=True).
+    wait() sleeps only when the loop is ahead of that timeline and returns the due
+    time in ns from `clock` (time.monotonic_ns by default); a loop that falls behind
+    is released immediately until it has caught up, instead of the rate silently
+    dropping. Timing anything from the returned due time avoids coordinated omission.
+    """
+
+    def __init__(self, rate, poisson=False, clock=time.monotonic_ns):
+        self.interval_ns = 1e9 / rate
+        self.poisson = poisson
+        self.clock = clock
+        self.next_ns = None
+        self.late_sends = 0
+        self.max_lag_ns = 0
+
+    def wait(self):
+        now = self.clock()
+        if self.next_ns is None:
+            self.next_ns = now
+        due = self.next_ns
+        if due > now:
+            time.sleep((due - now) / 1e9)
+        else:
+            lag = now - due
+            if lag > self.interval_ns:
+                self.late_sends += 1
+            self.max_lag_ns = max(self.max_lag_ns, lag)
+        gap = random.expovariate(1.0) if self.poisson else 1.0
+        self.next_ns += gap * self.interval_ns
+        return int(due)
+
+    def set_rate(self, rate):
+        """Change the rate, restarting the schedule from now (any backlog is dropped)."""
+        self.interval_ns = 1e9 / rate
+        if self.next_ns is not None:
+            self.next_ns = max(self.next_ns, self.clock())
+
+
+class StatsReporter:
+    """Background thread that prints throughput and totals every `interval` seconds.
+
+    Publish loops and message handlers just do `reporter.messages += 1` (and bytes,
+    errors); nothing is formatted or printed per message. Each counter should have
+    a single writer thread. An interval of 0 disables periodic output.
+
+    Several threads can share one report by each counting into their own object with
+    messages/bytes/errors attributes (e.g. an unstarted StatsReporter) passed in
+    `sources`; reports and totals() add them to this reporter's own counters.
+    `extra`, if given, is called for each report and its text appended to the line.
+    """
+
+    def __init__(self, label, interval=5.0, sources=(), extra=None):
+        self.label = label
+        self.interval = interval
+        self.messages = 0
+        self.bytes = 0
+        self.errors = 0
+        self.sources = list(sources)
+        self.extra = extra
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = None
+        self._last = None
+
+    def start(self):
+        self._start = time.monotonic()
+        self._last = (self._start, 0, 0)
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="stats-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.report()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def totals(self):
+        messages, nbytes, errors = self.messages, self.bytes, self.errors
+        for source in self.sources:
+            messages += source.messages
+            nbytes += source.bytes
+            errors += source.errors
+        return messages, nbytes, errors
+
+    def report(self):
+        now = time.monotonic()
+        messages, nbytes, errors = self.totals()
+        last_time, last_messages, last_bytes = self._last
+        self._last = (now, messages, nbytes)
+        elapsed = max(now - last_time, 1e-9)
+        print(
+            f"[stats] {now - self._start:8.1f}s {self.label}: "
+            f"{(messages - last_messages) / elapsed:.1f} msgs/sec, "
+            f"{(nbytes - last_bytes) / elapsed / (1024 * 1024):.3f} MB/sec | "
+            f"total {messages} msgs, {nbytes} bytes, {errors} errors"
+            + (f" | {self.extra()}" if self.extra is not None else ""),
+            flush=True,
+        )
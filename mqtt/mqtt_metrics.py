@@ -0,0 +1,177 @@
+###############################################################################
+#
+# Shared helpers for the MQTT load test scripts:
+#
+#   - a small binary header (send timestamp, publisher id, sequence number)
+#     that publishers can stamp on the front of each payload
+#   - a fixed-memory, log-bucketed latency histogram for subscribers
+#   - a bounded per-publisher sequence tracker (loss/duplicates/reordering)
+#   - an open-loop rate pacer for --rate publishing
+#   - a background reporter that prints interval/cumulative throughput
+#   - a generated topic hierarchy to spread publishes over (fan-out tests)
+#   - a ring of preallocated payload buffers, stamped in place
+#
+# Import from a script in this directory, e.g.:
+#
+#   from mqtt_metrics import LatencyHistogram, parse_header, stamp_header
+#
+# LatencyHistogram, SequenceTracker, RatePacer and StatsReporter live in
+# ../common/loadtest_metrics.py, shared with the Solace scripts, and are
+# re-exported here.
+#
+###############################################################################
+
+import bisect
+import itertools
+import os
+import random
+import string
+import struct
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from loadtest_metrics import (  # noqa: E402, F401
+    PERCENTILES,
+    LatencyHistogram,
+    RatePacer,
+    SequenceTracker,
+    StatsReporter,
+)
+
+# magic, clock, send timestamp (ns), publisher id, sequence number
+HEADER = struct.Struct("!4sBQIQ")
+HEADER_MAGIC = b"MQLT"
+HEADER_SIZE = HEADER.size
+
+# Which clock the send timestamp was taken from. The monotonic clock is only
+# comparable between processes on the same host; use the wall clock (with NTP/PTP
+# synced hosts) when publisher and subscriber run on different machines.
+CLOCK_MONOTONIC = 0
+CLOCK_WALL = 1
+CLOCKS = {"monotonic": CLOCK_MONOTONIC, "wall": CLOCK_WALL}
+CLOCK_FUNCS = {CLOCK_MONOTONIC: time.monotonic_ns, CLOCK_WALL: time.time_ns}
+
+
+def clock_ns(clock):
+    return CLOCK_FUNCS[clock]()
+
+
+def publisher_id(client_id):
+    """32-bit id for a publisher's client id, carried in every stamped payload."""
+    return zlib.crc32(str(client_id).encode("utf-8"))
+
+
+def stamp_header(payload, pub_id, seq, clock=CLOCK_MONOTONIC, send_ns=None):
+    """Return payload with a header in front, keeping the total size unchanged where possible.
+
+    send_ns defaults to now; rate-paced publishers pass the intended send time instead
+    so that time spent behind schedule shows up as latency.
+    """
+    if send_ns is None:
+        send_ns = clock_ns(clock)
+    header = HEADER.pack(HEADER_MAGIC, clock, send_ns, pub_id, seq)
+    return header + payload[HEADER_SIZE:]
+
+
+def stamp_header_into(buffer, pub_id, seq, clock=CLOCK_MONOTONIC, send_ns=None):
+    """Write the header over the first HEADER_SIZE bytes of a bytearray, in place."""
+    if send_ns is None:
+        send_ns = clock_ns(clock)
+    HEADER.pack_into(buffer, 0, HEADER_MAGIC, clock, send_ns, pub_id, seq)
+    return buffer
+
+
+def parse_header(payload):
+    """Return (clock, send_ns, pub_id, seq) for a stamped payload, or None if it has no header."""
+    if len(payload) < HEADER_SIZE or payload[:4] != HEADER_MAGIC:
+        return None
+    _, clock, send_ns, pub_id, seq = HEADER.unpack_from(payload)
+    return clock, send_ns, pub_id, seq
+
+
+TOPIC_ORDERS = ("roundrobin", "random", "zipf")
+
+
+class TopicTree:
+    """Leaf topics of a generated hierarchy and a cheap per-message picker.
+
+    With base "test/topic", depth 2 and fanout 3 the leaves are test/topic/l0_0/l1_0,
+    test/topic/l0_0/l1_1 ... test/topic/l0_2/l1_2 (fanout ** depth topics). next()
+    walks them round-robin, uniformly at random, or Zipf-distributed (leaf k picked
+    with weight 1 / k ** exponent) to mimic a few hot topics and a long tail.
+    """
+
+    def __init__(self, base, depth, fanout, order="roundrobin", exponent=1.0, seed=None):
+        levels = [[f"l{level}_{i}" for i in range(fanout)] for level in range(depth)]
+        self.topics = ["/".join((base,) + leaf) for leaf in itertools.product(*levels)]
+        self.order = order
+        self.random = random.Random(seed)
+        self.position = 0
+        if order == "zipf":
+            self.cum_weights = list(
+                itertools.accumulate(1.0 / (k**exponent) for k in range(1, len(self.topics) + 1))
+            )
+
+    def next(self):
+        if self.order == "random":
+            return self.topics[self.random.randrange(len(self.topics))]
+        if self.order == "zipf":
+            x = self.random.random() * self.cum_weights[-1]
+            return self.topics[bisect.bisect_right(self.cum_weights, x)]
+        topic = self.topics[self.position]
+        self.position = (self.position + 1) % len(self.topics)
+        return topic
+
+
+def topic_prefix(topic, depth):
+    """First `depth` levels of a topic, e.g. topic_prefix("a/b/c", 2) == "a/b"."""
+    return "/".join(topic.split("/", depth)[:depth])
+
+
+_ALNUM = (string.ascii_letters + string.digits).encode("ascii")
+_ALNUM_TABLE = bytes(_ALNUM[i % len(_ALNUM)] for i in range(256))
+
+
+def random_payload(size):
+    """size random alphanumeric bytes, generated in bulk rather than a char at a time."""
+    return os.urandom(size).translate(_ALNUM_TABLE)
+
+
+class PayloadPool:
+    """Ring of payload buffers allocated once at startup and reused for every publish.
+
+    next() hands out the buffers in turn; with a header it is written over the
+    first HEADER_SIZE bytes in place, so publishing allocates nothing per message
+    however large the payload. paho copies the payload into the outgoing packet
+    inside publish(), but keeps a reference for QoS>0 retransmission after a
+    reconnect, so the ring should be larger than the in-flight window.
+    """
+
+    def __init__(self, buffers):
+        self.buffers = buffers
+        self.index = 0
+
+    @classmethod
+    def random(cls, size, count):
+        """count distinct random alphanumeric payloads of size bytes each."""
+        return cls([bytearray(random_payload(size)) for _ in range(count)])
+
+    @classmethod
+    def repeat(cls, payload, count):
+        """count copies of one fixed payload."""
+        return cls([bytearray(payload) for _ in range(count)])
+
+    def next(self):
+        buffer = self.buffers[self.index]
+        self.index += 1
+        if self.index == len(self.buffers):
+            self.index = 0
+        return buffer
+
+    def next_stamped(self, pub_id, seq, clock=CLOCK_MONOTONIC, send_ns=None):
+        buffer = self.next()
+        if len(buffer) < HEADER_SIZE:
+            buffer.extend(bytes(HEADER_SIZE - len(buffer)))
+        return stamp_header_into(buffer, pub_id, seq, clock, send_ns)
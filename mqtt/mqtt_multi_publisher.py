@@ -0,0 +1,321 @@
+###############################################################################
+#
+# Single-process MQTT load generator: drives many publishing client sessions
+# from one asyncio event loop (optionally spread over a few worker processes)
+# instead of forking one mqtt_publisher.py per client.
+#
+# Examples:
+#
+#   python3 mqtt_multi_publisher.py --broker localhost --port 1884 --topic test/topic --clients 1000 --nummsgs 100 --size 2000
+#   python3 mqtt_multi_publisher.py --broker localhost --port 1884 --topic test/topic --clients 5000 --nummsgs 100 --size 200 --workers 4 --inflight 10
+#   python3 mqtt_multi_publisher.py --broker localhost --port 1884 --topic test/topic --clients 100 --nummsgs 1000 --topic-depth 3 --topic-fanout 10 --topic-order zipf
+#
+# Help:
+#
+#   python3 mqtt_multi_publisher.py -h
+#
+###############################################################################
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.client import CallbackAPIVersion
+
+from mqtt_metrics import CLOCKS, TOPIC_ORDERS, PayloadPool, TopicTree, publisher_id
+
+# Defaults mirror mqtt_multi_publisher_load_test.sh
+DEFAULT_PORT = 1883
+DEFAULT_CLIENTS = 10
+DEFAULT_MESSAGES = 1000
+DEFAULT_SIZE = 100
+DEFAULT_QOS = 1
+DEFAULT_INFLIGHT = 1
+DEFAULT_CLIENTID_PREFIX = "publisher-"
+KEEPALIVE = 1200
+
+
+class AsyncioHelper:
+    """Runs a paho client's network I/O on an asyncio loop instead of its own thread."""
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        self.misc = None
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        self.misc = self.loop.create_task(self.misc_loop())
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self.misc is not None:
+            self.misc.cancel()
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def misc_loop(self):
+        # Keepalive pings and retries; paho expects this roughly once a second
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                break
+
+
+class WorkerStats:
+    """Counters for all client sessions in one worker process."""
+
+    def __init__(self):
+        self.connected = 0
+        self.connect_failures = 0
+        self.published = 0
+        self.acked = 0
+        self.errors = 0
+        self.bytes = 0
+        self.first_send = None
+        self.last_ack = None
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+async def run_client(loop, args, client_id, payloads, stats):
+    client = mqtt.Client(
+        client_id=client_id, callback_api_version=CallbackAPIVersion.VERSION2
+    )
+    if args.username:
+        client.username_pw_set(username=args.username, password=args.password)
+    client.max_inflight_messages_set(args.inflight)
+
+    connected = loop.create_future()
+    disconnected = loop.create_future()
+    window = asyncio.Semaphore(args.inflight)
+    drained = asyncio.Event()
+    outstanding = 0
+
+    def on_connect(client, userdata, flags, reason_code, properties):
+        if not connected.done():
+            connected.set_result(reason_code)
+
+    def on_disconnect(client, userdata, flags, reason_code, properties):
+        if not connected.done():
+            connected.set_result(reason_code)
+        if not disconnected.done():
+            disconnected.set_result(reason_code)
+        # Unblock the publish loop if the session drops mid-run
+        drained.set()
+        window.release()
+
+    def on_publish(client, userdata, mid, reason_code, properties):
+        nonlocal outstanding
+        stats.acked += 1
+        stats.last_ack = time.time()
+        outstanding -= 1
+        if outstanding == 0:
+            drained.set()
+        window.release()
+
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    client.on_publish = on_publish
+    AsyncioHelper(loop, client)
+
+    try:
+        client.connect(args.broker, args.port, KEEPALIVE)
+        reason_code = await asyncio.wait_for(connected, args.connect_timeout)
+    except Exception:
+        stats.connect_failures += 1
+        return
+    if reason_code.is_failure:
+        stats.connect_failures += 1
+        return
+    stats.connected += 1
+
+    pub_id = publisher_id(client_id)
+    topic_tree = None
+    if args.topic_depth:
+        topic_tree = TopicTree(args.topic, args.topic_depth, args.topic_fanout, args.topic_order, args.zipf_exponent)
+    for seq in range(1, args.nummsgs + 1):
+        await window.acquire()
+        if disconnected.done():
+            stats.errors += 1
+            return
+        if stats.first_send is None:
+            stats.first_send = time.time()
+        drained.clear()
+        outstanding += 1
+        if args.latency:
+            msg = payloads.next_stamped(pub_id, seq, CLOCKS[args.latency_clock])
+        else:
+            msg = payloads.next()
+        topic = topic_tree.next() if topic_tree is not None else args.topic
+        info = client.publish(topic, msg, args.qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            stats.errors += 1
+            outstanding -= 1
+            window.release()
+            continue
+        stats.published += 1
+        stats.bytes += len(msg)
+
+    if outstanding:
+        await drained.wait()
+    if disconnected.done():
+        return
+    client.disconnect()
+    try:
+        await asyncio.wait_for(disconnected, args.connect_timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_clients(args, client_ids, payloads, stats):
+    loop = asyncio.get_running_loop()
+    tasks = []
+    for client_id in client_ids:
+        tasks.append(loop.create_task(run_client(loop, args, client_id, payloads, stats)))
+        # client.connect() blocks on the TCP handshake; yield so earlier sessions make progress
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+
+def worker_main(worker_args):
+    args, client_ids = worker_args
+    stats = WorkerStats()
+    # One ring of preallocated payloads per worker, shared by its sessions. publish()
+    # copies the payload into the outgoing packet, and these sessions never reconnect
+    # (so paho never resends a stored payload), so reusing a buffer is safe.
+    payloads = PayloadPool.random(args.size, args.payload_pool)
+    asyncio.run(run_clients(args, client_ids, payloads, stats))
+    return stats.as_dict()
+
+
+def merge_stats(results):
+    totals = WorkerStats().as_dict()
+    for result in results:
+        for key in ("connected", "connect_failures", "published", "acked", "errors", "bytes"):
+            totals[key] += result[key]
+        if result["first_send"] is not None:
+            if totals["first_send"] is None or result["first_send"] < totals["first_send"]:
+                totals["first_send"] = result["first_send"]
+        if result["last_ack"] is not None:
+            if totals["last_ack"] is None or result["last_ack"] > totals["last_ack"]:
+                totals["last_ack"] = result["last_ack"]
+    return totals
+
+
+def main(args):
+    print(
+        f"Starting {args.clients} client(s) across {args.workers} worker(s) to publish "
+        f"{args.nummsgs} message(s) of {args.size} byte(s) each to {args.broker}:{args.port} "
+        f"on topic '{args.topic}' with qos={args.qos}, inflight={args.inflight}"
+    )
+
+    client_ids = [f"{args.clientid_prefix}{i}" for i in range(1, args.clients + 1)]
+    shards = [client_ids[w :: args.workers] for w in range(args.workers)]
+    shards = [shard for shard in shards if shard]
+
+    start_time = time.time()
+    if len(shards) == 1:
+        results = [worker_main((args, shards[0]))]
+    else:
+        with multiprocessing.Pool(len(shards)) as pool:
+            results = pool.map(worker_main, [(args, shard) for shard in shards])
+    end_time = time.time()
+
+    totals = merge_stats(results)
+    send_window = (totals["last_ack"] or end_time) - (totals["first_send"] or start_time)
+    send_window = max(send_window, 1e-9)
+
+    print(f"Clients connected: {totals['connected']}/{args.clients} (failures: {totals['connect_failures']})")
+    print(f"Messages published: {totals['published']} (acked: {totals['acked']}, errors: {totals['errors']})")
+    print(f"Bytes published: {totals['bytes']}")
+    print(f"Total run time: {end_time - start_time:.2f} seconds (incl. connect/disconnect)")
+    print(
+        f"Throughput: {totals['acked'] / send_window:.2f} msgs/sec, "
+        f"{totals['bytes'] / send_window / (1024 * 1024):.2f} MB/sec "
+        f"over {send_window:.2f} seconds from first send to last ack"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTT Multi-Client Load Test Publisher")
+    parser.add_argument("--broker", type=str, required=True, help="MQTT Broker URL or IP")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="MQTT Broker Port (default: 1883)")
+    parser.add_argument(
+        "--topic", type=str, required=True, help="Topic, or base topic of the generated tree with --topic-depth"
+    )
+    parser.add_argument(
+        "--topic-depth",
+        type=int,
+        default=0,
+        help="Spread messages over a generated topic tree this many levels below --topic (default: 0)",
+    )
+    parser.add_argument("--topic-fanout", type=int, default=10, help="Children per tree level (default: 10)")
+    parser.add_argument(
+        "--topic-order",
+        type=str,
+        choices=TOPIC_ORDERS,
+        default="roundrobin",
+        help="Order in which tree topics are used (default: roundrobin)",
+    )
+    parser.add_argument("--zipf-exponent", type=float, default=1.0, help="Skew of --topic-order zipf (default: 1.0)")
+    parser.add_argument(
+        "--clientid-prefix",
+        type=str,
+        default=DEFAULT_CLIENTID_PREFIX,
+        help="Client id prefix; clients are numbered from 1 (default: publisher-)",
+    )
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="Number of client sessions (default: 10)")
+    parser.add_argument(
+        "--nummsgs", type=int, default=DEFAULT_MESSAGES, help="Messages per client (default: 1000)"
+    )
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="Message size in bytes (default: 100)")
+    parser.add_argument(
+        "--payload-pool",
+        type=int,
+        default=16,
+        help="Distinct preallocated random payloads per worker to rotate through (default: 16)",
+    )
+    parser.add_argument("--qos", type=int, default=DEFAULT_QOS, choices=[0, 1, 2], help="QoS (default: 1)")
+    parser.add_argument(
+        "--inflight",
+        type=int,
+        default=DEFAULT_INFLIGHT,
+        help="Max unacknowledged publishes per client (default: 1)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Worker processes to spread clients over (default: 1)"
+    )
+    parser.add_argument(
+        "--connect-timeout", type=float, default=30, help="Seconds to wait for CONNACK (default: 30)"
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Stamp each payload with a send timestamp/publisher id/sequence header for mqtt_subscriber.py --latency",
+    )
+    parser.add_argument(
+        "--latency-clock",
+        type=str,
+        choices=sorted(CLOCKS),
+        default="monotonic",
+        help="Clock for the send timestamp: monotonic (same host) or wall (synced hosts)",
+    )
+    parser.add_argument("--username", type=str, default=None, help="Broker username (optional)")
+    parser.add_argument("--password", type=str, default=None, help="Broker password (optional)")
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+    args.inflight = max(1, args.inflight)
+    main(args)
@@ -0,0 +1,279 @@
+###############################################################################
+#
+# Subscriber fleet runner: drives many subscribing client sessions from one
+# asyncio event loop per worker process and merges their counts, bytes and
+# latency histograms into a single fan-out summary.
+#
+# Stops once every subscriber has received --expect messages, or after
+# --duration seconds (counted from when the whole fleet is subscribed),
+# whichever comes first. --expect needs --duration as an overall timeout, so a
+# lost message ends the run with the incomplete subscribers reported instead
+# of waiting forever.
+#
+# Examples:
+#
+#   python3 mqtt_multi_subscriber.py --broker localhost --port 1884 --topic test/topic --clients 100 --expect 1000 --duration 300
+#   python3 mqtt_multi_subscriber.py --broker localhost --port 1884 --topic test/topic --clients 2000 --workers 4 --duration 60 --latency
+#
+# Start the fleet first, wait for "subscribed", then start the publisher(s)
+# (with --latency to get end-to-end latency percentiles).
+#
+# Help:
+#
+#   python3 mqtt_multi_subscriber.py -h
+#
+###############################################################################
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.client import CallbackAPIVersion
+
+from mqtt_metrics import LatencyHistogram, clock_ns, parse_header
+from mqtt_multi_publisher import AsyncioHelper
+
+DEFAULT_PORT = 1883
+DEFAULT_CLIENTS = 10
+DEFAULT_QOS = 1
+DEFAULT_CLIENTID_PREFIX = "subscriber-"
+KEEPALIVE = 1200
+
+
+def str2bool(v):
+    if isinstance(v, bool):
+        return v
+    if v.lower() in ("yes", "true", "t", "y", "1"):
+        return True
+    elif v.lower() in ("no", "false", "f", "n", "0"):
+        return False
+    else:
+        raise argparse.ArgumentTypeError("Boolean value expected.")
+
+
+class WorkerStats:
+    """Counters and latency histogram for all subscribers in one worker process."""
+
+    def __init__(self):
+        self.subscribed = 0
+        self.connect_failures = 0
+        self.messages = 0
+        self.bytes = 0
+        self.first_arrival = None
+        self.last_arrival = None
+        self.per_subscriber = []  # messages received by each subscriber
+        self.completed = 0  # subscribers that reached --expect
+        self.latency = LatencyHistogram()
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+async def run_subscriber(loop, args, client_id, stats, stop):
+    client = mqtt.Client(
+        client_id=client_id,
+        clean_session=args.cleansession,
+        callback_api_version=CallbackAPIVersion.VERSION2,
+    )
+    if args.username:
+        client.username_pw_set(username=args.username, password=args.password)
+
+    subscribed = loop.create_future()
+    reached = asyncio.Event()
+    received = 0
+
+    def on_connect(client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            if not subscribed.done():
+                subscribed.set_result(False)
+            return
+        client.subscribe([(topic, args.qos) for topic in args.topic])
+
+    def on_subscribe(client, userdata, mid, reason_codes, properties):
+        if not subscribed.done():
+            subscribed.set_result(not any(rc.is_failure for rc in reason_codes))
+
+    def on_message(client, userdata, message):
+        nonlocal received
+        received += 1
+        now = time.time()
+        stats.messages += 1
+        stats.bytes += len(message.payload)
+        if stats.first_arrival is None:
+            stats.first_arrival = now
+        stats.last_arrival = now
+        if args.latency:
+            header = parse_header(message.payload)
+            if header is not None:
+                stats.latency.record(clock_ns(header[0]) - header[1])
+        if received == args.expect:
+            reached.set()
+
+    client.on_connect = on_connect
+    client.on_subscribe = on_subscribe
+    client.on_message = on_message
+    AsyncioHelper(loop, client)
+
+    try:
+        client.connect(args.broker, args.port, KEEPALIVE)
+        ok = await asyncio.wait_for(subscribed, args.connect_timeout)
+    except Exception:
+        ok = False
+    if not ok:
+        stats.connect_failures += 1
+        return None
+    stats.subscribed += 1
+
+    waits = [loop.create_task(stop.wait())]
+    if args.expect:
+        waits.append(loop.create_task(reached.wait()))
+    _, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if reached.is_set():
+        stats.completed += 1
+    client.disconnect()
+    return received
+
+
+async def run_subscribers(args, client_ids, stats, ready):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    tasks = []
+    for client_id in client_ids:
+        tasks.append(loop.create_task(run_subscriber(loop, args, client_id, stats, stop)))
+        await asyncio.sleep(0)
+
+    # Tell the parent once every session in this worker has connected (or failed)
+    while stats.subscribed + stats.connect_failures < len(client_ids):
+        await asyncio.sleep(0.1)
+    ready.put(stats.subscribed)
+
+    if args.duration:
+        loop.call_later(args.duration, stop.set)
+    results = await asyncio.gather(*tasks)
+    stats.per_subscriber = [r for r in results if r is not None]
+
+
+def worker_main(args, client_ids, ready, results):
+    stats = WorkerStats()
+    asyncio.run(run_subscribers(args, client_ids, stats, ready))
+    results.put(stats.as_dict())
+
+
+def merge_stats(results):
+    totals = WorkerStats().as_dict()
+    for result in results:
+        for key in ("subscribed", "connect_failures", "messages", "bytes", "completed"):
+            totals[key] += result[key]
+        totals["per_subscriber"].extend(result["per_subscriber"])
+        totals["latency"].merge(result["latency"])
+        if result["first_arrival"] is not None:
+            if totals["first_arrival"] is None or result["first_arrival"] < totals["first_arrival"]:
+                totals["first_arrival"] = result["first_arrival"]
+        if result["last_arrival"] is not None:
+            if totals["last_arrival"] is None or result["last_arrival"] > totals["last_arrival"]:
+                totals["last_arrival"] = result["last_arrival"]
+    return totals
+
+
+def main(args):
+    stop_on = []
+    if args.expect:
+        stop_on.append(f"{args.expect} message(s) per subscriber")
+    if args.duration:
+        stop_on.append(f"{args.duration} second(s)")
+    print(
+        f"Starting {args.clients} subscriber(s) across {args.workers} worker(s) on "
+        f"{args.broker}:{args.port} topic(s) {', '.join(args.topic)} with qos={args.qos}; "
+        f"stopping after {' or '.join(stop_on)}"
+    )
+
+    client_ids = [f"{args.clientid_prefix}{i}" for i in range(1, args.clients + 1)]
+    shards = [client_ids[w :: args.workers] for w in range(args.workers)]
+    shards = [shard for shard in shards if shard]
+
+    ready = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=worker_main, args=(args, shard, ready, results))
+        for shard in shards
+    ]
+    for worker in workers:
+        worker.start()
+
+    subscribed = sum(ready.get() for _ in workers)
+    print(f"{subscribed}/{args.clients} subscriber(s) subscribed; start publishing now")
+
+    worker_results = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    totals = merge_stats(worker_results)
+    per_subscriber = totals["per_subscriber"] or [0]
+    window = (totals["last_arrival"] or 0) - (totals["first_arrival"] or 0)
+    window = max(window, 1e-9)
+
+    print(f"Subscribers: {totals['subscribed']}/{args.clients} (failures: {totals['connect_failures']})")
+    if args.expect:
+        print(
+            f"Subscribers that received all {args.expect} message(s): {totals['completed']} "
+            f"(incomplete: {totals['subscribed'] - totals['completed']})"
+        )
+    print(f"Messages received: {totals['messages']} ({totals['bytes']} bytes)")
+    print(
+        f"Per subscriber: min={min(per_subscriber)} "
+        f"avg={sum(per_subscriber) / len(per_subscriber):.1f} max={max(per_subscriber)}"
+    )
+    print(
+        f"Fan-out throughput: {totals['messages'] / window:.2f} msgs/sec, "
+        f"{totals['bytes'] / window / (1024 * 1024):.2f} MB/sec "
+        f"over {window:.2f} seconds from first to last arrival"
+    )
+    if args.latency:
+        print(f"Latency: {totals['latency'].format()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTT Multi-Client Load Test Subscriber")
+    parser.add_argument("--broker", type=str, required=True, help="MQTT Broker URL or IP")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="MQTT Broker Port (default: 1883)")
+    parser.add_argument(
+        "--topic", type=str, nargs="+", required=True, help="One or more topic filters (+/# wildcards allowed)"
+    )
+    parser.add_argument(
+        "--clientid-prefix",
+        type=str,
+        default=DEFAULT_CLIENTID_PREFIX,
+        help="Client id prefix; clients are numbered from 1 (default: subscriber-)",
+    )
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="Number of subscribers (default: 10)")
+    parser.add_argument("--qos", type=int, default=DEFAULT_QOS, choices=[0, 1, 2], help="QoS (default: 1)")
+    parser.add_argument(
+        "--cleansession",
+        type=str2bool,
+        default=True,
+        help="Start with a clean session (default: true)",
+    )
+    parser.add_argument("--expect", type=int, default=0, help="Stop each subscriber after N messages (needs --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds once subscribed (required)")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Worker processes to spread subscribers over (default: 1)"
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Record end-to-end latency from payload headers (publisher run with --latency)",
+    )
+    parser.add_argument(
+        "--connect-timeout", type=float, default=30, help="Seconds to wait for CONNACK/SUBACK (default: 30)"
+    )
+    parser.add_argument("--username", type=str, default=None, help="Broker username (optional)")
+    parser.add_argument("--password", type=str, default=None, help="Broker password (optional)")
+    args = parser.parse_args()
+    if not args.duration:
+        parser.error("--duration is required (with --expect it is the overall timeout)")
+    args.workers = max(1, args.workers)
+    main(args)
@@ -1,10 +1,14 @@
-#!/bin/bash
-# Usage ./mqtt_load_test.sh [#clients] [#messages per client] [message size in bytes]
-
-echo "Spawning $1 subscribers"
-
-time for (( i=1; i <= $1; i++ )); do      
-  time python3 mqtt_subscriber.py --broker 127.17.0.5 --port 1885 --clientid subscriber-$i --qos 1 --nummsgs $2 --cleansession false --topic test/topic2 &
-done
-
-
+#!/bin/bash
+# Usage ./mqtt_multi_subscriber_load_test.sh <broker> <port> <topic> [#subscribers] [#messages per subscriber] [#worker processes] [max seconds, default 300]
+# Examples:
+# ./mqtt_multi_subscriber_load_test.sh localhost 1885 test/topic2 10 1000
+# ./mqtt_multi_subscriber_load_test.sh localhost 1885 test/topic2 2000 1000 4 300
+#
+# All subscribers are driven from mqtt_multi_subscriber.py (one asyncio event loop per worker process);
+# the run stops when every subscriber has its messages (or after max seconds) and prints one summary.
+
+echo "Spawning $4 subscribers"
+
+time python3 mqtt_multi_subscriber.py --broker $1 --port $2 --topic $3 --clientid-prefix subscriber- --qos 1 \
+  --cleansession false --clients ${4:-10} --expect ${5:-1000} --workers ${6:-1} --duration ${7:-300} \
+  --username ${MQTT_USERNAME:-admin} --password ${MQTT_PASSWORD:-admin} --latency
@@ -15,6 +15,10 @@
 #
 #    --broker localhost --port 1884 --clientid py-pub-01 --qos 1 --nummsgs 5000 --delay 0 --topic sometopic
 #    --broker localhost --port 1884 --clientid py-pub-01 --qos 1 --nummsgs 5000 --delay 0 --topic sometopic --message 100
+#    --broker localhost --port 1884 --clientid py-pub-01 --qos 1 --nummsgs 50000 --delay 0 --topic sometopic --inflight 100
+#    --broker localhost --port 1884 --clientid py-pub-01 --qos 1 --nummsgs 5000 --delay 0 --topic sometopic --message 100 --latency 1
+#    --broker localhost --port 1884 --clientid py-pub-01 --qos 1 --nummsgs 60000 --topic sometopic --inflight 100 --rate 1000 --arrivals poisson
+#    --broker localhost --port 1884 --clientid py-pub-01 --qos 1 --nummsgs 50000 --topic sometopic --topic-depth 3 --topic-fanout 10 --topic-order zipf
 #
 #    Linux Message:
 #       --message "{\"field\":\"blah\"}"
@@ -35,15 +39,27 @@
 ###############################################################################
 
 import argparse
-import datetime
 import logging
-import random
-import string
+import threading
 import time
 
 import paho.mqtt.client as mqtt
 from paho.mqtt.client import CallbackAPIVersion  # Add this import
 
+from mqtt_metrics import (
+    CLOCK_FUNCS,
+    CLOCKS,
+    TOPIC_ORDERS,
+    LatencyHistogram,
+    PayloadPool,
+    RatePacer,
+    StatsReporter,
+    TopicTree,
+    clock_ns,
+    publisher_id,
+    stamp_header,
+)
+
 # Broker settings
 keepalive = 1200
 
@@ -56,12 +72,67 @@ parser.add_argument("--qos", help="")
 parser.add_argument("--nummsgs", help="")
 parser.add_argument("--delay", help="Delay between publishing messages in seconds")
 parser.add_argument("--cleansession", help="")
-parser.add_argument("--topic", help="")
+parser.add_argument("--topic", help="Topic, or base topic of the generated tree with --topic-depth")
+parser.add_argument(
+    "--topic-depth",
+    help="Spread messages over a generated topic tree this many levels below --topic (default 0: just --topic)",
+    default="0",
+)
+parser.add_argument("--topic-fanout", help="Children per level of the topic tree (default 10)", default="10")
+parser.add_argument(
+    "--topic-order",
+    help="Order in which tree topics are used (default roundrobin)",
+    choices=TOPIC_ORDERS,
+    default="roundrobin",
+)
+parser.add_argument("--zipf-exponent", help="Skew of --topic-order zipf (default 1.0)", default="1.0")
 parser.add_argument(
     "--message",
     help="Custom message to send to topic or length of random string to generate",
 )
-parser.add_argument("--silent", help="Logging? 1 for true, 0 for false", default="0")
+parser.add_argument(
+    "--payload-pool",
+    help="Number of distinct preallocated random payloads to rotate through (default 16)",
+    default="16",
+)
+parser.add_argument(
+    "--silent",
+    help="Suppress per-message logging? 1 for true (default), 0 to log every publish and ack",
+    default="1",
+)
+parser.add_argument(
+    "--stats-interval",
+    help="Print interval/cumulative throughput every N seconds (0 to disable, default 5)",
+    default="5",
+)
+parser.add_argument(
+    "--inflight",
+    help="Max number of unacknowledged publishes outstanding at once (default 1)",
+    default="1",
+)
+parser.add_argument(
+    "--latency",
+    help="Stamp each payload with a send timestamp/publisher id/sequence header "
+    "for mqtt_subscriber.py --latency? 1 for true, 0 for false",
+    default="0",
+)
+parser.add_argument(
+    "--latency-clock",
+    help="Clock for the send timestamp: monotonic (same host) or wall (synced hosts)",
+    choices=sorted(CLOCKS),
+    default="monotonic",
+)
+parser.add_argument(
+    "--rate",
+    help="Target publish rate in msgs/sec on an absolute schedule (overrides --delay); "
+    "latency is measured from each message's intended send time",
+)
+parser.add_argument(
+    "--arrivals",
+    help="Spacing of sends in --rate mode: fixed or poisson (default fixed)",
+    choices=["fixed", "poisson"],
+    default="fixed",
+)
 args = parser.parse_args()
 
 logging.basicConfig(
@@ -72,6 +143,19 @@ logging.basicConfig(
 
 print(args)
 
+silent = int(args.silent)
+stats = StatsReporter("published", float(args.stats_interval))
+
+# Publish window: mids of publishes not yet acknowledged by the broker, mapped to
+# their intended send time. Guarded by inflight_cond, which on_publish notifies
+# whenever a slot frees up.
+inflight_limit = max(1, int(args.inflight))
+inflight_mids = {}
+early_acked_mids = {}  # acks (and their time) that arrived before publish() returned the mid
+inflight_cond = threading.Condition()
+latency_clock = CLOCKS[args.latency_clock]
+ack_latency = LatencyHistogram()  # intended send -> broker ack, recorded in --rate mode
+
 
 def on_disconnect(client, userdata, flags, rc=0):
     m = "DisConnected flags" + "result code: " + str(rc) + ", client_id: " + str(client)
@@ -91,47 +175,62 @@ def on_connect(client, userdata, flags, rc):
 
 
 def on_publish(client, userdata, mid):
-    m = (
-        "Broker ack received, result code: "
-        + str(userdata)
-        + "; client_id: "
-        + str(mid)
-    )
-    if not int(args.silent):
-        print(m)
-    global pub_ack
-    pub_ack = True
-
-
-def pub(client, topic, msg, qos, p_msg):
-    if len(msg) <= 30 and not int(args.silent):
-        logging.info(
-            datetime.datetime.now().strftime("%d.%b %Y %H:%M:%S")
-            + " "
-            + p_msg
-            + " publishing "
-            + msg
-            + " to topic="
-            + topic
-            + " with qos="
-            + str(qos)
+    if not silent:
+        m = (
+            "Broker ack received, result code: "
+            + str(userdata)
+            + "; client_id: "
+            + str(mid)
         )
-    else:
-        if not int(args.silent):
+        print(m)
+    acked_ns = clock_ns(latency_clock)
+    with inflight_cond:
+        if mid in inflight_mids:
+            intended_ns = inflight_mids.pop(mid)
+            if intended_ns is not None:
+                ack_latency.record(acked_ns - intended_ns)
+        else:
+            early_acked_mids[mid] = acked_ns
+        inflight_cond.notify_all()
+
+
+def pub(client, topic, msg, qos, p_msg, intended_ns=None):
+    if not silent:
+        # Debug only: the log format already carries the timestamp
+        if isinstance(msg, str) and len(msg) <= 30:
+            logging.info("%s publishing %s to topic=%s with qos=%s", p_msg, msg, topic, qos)
+        else:
             logging.info(
-                datetime.datetime.now().strftime("%d.%b %Y %H:%M:%S")
-                + " "
-                + p_msg
-                + " publishing message of size "
-                + str(len(msg))
-                + " byte(s) to topic="
-                + topic
-                + " with qos="
-                + str(qos)
+                "%s publishing message of size %d byte(s) to topic=%s with qos=%s", p_msg, len(msg), topic, qos
             )
+    # publish() takes paho's internal locks, which its network thread holds while calling
+    # on_publish; so publish outside inflight_cond and reconcile early acks afterwards
     ret = client.publish(topic, msg, qos)
-    if not int(args.silent):
-        logging.info("Publish result: " + str(ret))
+    if ret.rc == mqtt.MQTT_ERR_SUCCESS:
+        stats.messages += 1
+        stats.bytes += len(msg)
+    else:
+        stats.errors += 1
+    # Only a queued publish gets an on_publish: paho drops a failed one, except a QoS>0
+    # publish without a connection, which it keeps and resends on reconnect
+    queued = ret.rc == mqtt.MQTT_ERR_SUCCESS or (ret.rc == mqtt.MQTT_ERR_NO_CONN and qos > 0)
+    if queued:
+        with inflight_cond:
+            if ret.mid in early_acked_mids:
+                acked_ns = early_acked_mids.pop(ret.mid)
+                if intended_ns is not None:
+                    ack_latency.record(acked_ns - intended_ns)
+            else:
+                inflight_mids[ret.mid] = intended_ns
+    if not silent:
+        logging.info("Publish result: %s", ret)
+
+
+def wait_for_window(limit):
+    # Block (without spinning) until fewer than `limit` publishes are unacknowledged
+    with inflight_cond:
+        while len(inflight_mids) >= limit:
+            inflight_cond.wait()
 
 
 # Create MQTT client with callback API version
@@ -144,29 +243,100 @@ publishing_client.on_connect = on_connect
 publishing_client.on_publish = on_publish
 publishing_client.on_disconnect = on_disconnect
 
+# Let paho keep the whole window on the wire rather than queueing beyond its default of 20
+publishing_client.max_inflight_messages_set(inflight_limit)
+
 logging.info("Connecting...")
 # TODO: make username/password optional args
 publishing_client.username_pw_set(username="admin", password="admin")
 publishing_client.connect(args.broker, int(args.port), keepalive)  # connect to broker
 publishing_client.loop_start()
 
-print("Publishing " + str(int(args.nummsgs)) + " messages...")
+print(
+    "Publishing "
+    + str(int(args.nummsgs))
+    + " messages with up to "
+    + str(inflight_limit)
+    + " in flight..."
+)
 
+# Payloads come from a ring of buffers allocated here, once; headers are stamped into
+# them in place. The ring outlasts the in-flight window so paho never resends a
+# buffer that has since been overwritten.
+payload_pool = None
+pool_size = max(int(args.payload_pool), inflight_limit + 1)
 if not args.message:
-    message = "Message " + str(x)
+    message = None  # "Message <n>", built per message
 elif args.message.isdigit():
-    message = "".join(
-        random.choices(string.ascii_uppercase + string.digits, k=int(args.message))
-    )
+    payload_pool = PayloadPool.random(int(args.message), pool_size)
 else:
     message = args.message
+    if int(args.latency):
+        payload_pool = PayloadPool.repeat(message.encode("utf-8"), pool_size)
+
+if int(args.latency):
+    latency_pub_id = publisher_id(args.clientid)
+
+topic_tree = None
+if int(args.topic_depth):
+    topic_tree = TopicTree(
+        args.topic, int(args.topic_depth), int(args.topic_fanout), args.topic_order, float(args.zipf_exponent)
+    )
+    print("Publishing over " + str(len(topic_tree.topics)) + " topics (" + args.topic_order + ")")
+
+pacer = None
+if args.rate:
+    pacer = RatePacer(float(args.rate), args.arrivals == "poisson", CLOCK_FUNCS[latency_clock])
 
+start_time = time.time()
+stats.start()
 for x in range(1, int(args.nummsgs) + 1):
-    pub_ack = False
-    time.sleep(float(args.delay))  # Simulate speed of client
-    pub(publishing_client, args.topic, message, int(args.qos), args.clientid)
-    while pub_ack != True:
-        pass
+    intended_ns = None
+    if pacer is not None:
+        intended_ns = pacer.wait()  # open loop: the schedule doesn't wait for acks
+    else:
+        time.sleep(float(args.delay or 0))  # Simulate speed of client
+    wait_for_window(inflight_limit)
+    if payload_pool is not None:
+        if int(args.latency):
+            msg = payload_pool.next_stamped(latency_pub_id, x, latency_clock, intended_ns)
+        else:
+            msg = payload_pool.next()
+    elif message is None:
+        msg = "Message " + str(x)
+        if int(args.latency):
+            msg = stamp_header(msg.encode("utf-8"), latency_pub_id, x, latency_clock, intended_ns)
+    else:
+        msg = message
+    topic = topic_tree.next() if topic_tree is not None else args.topic
+    pub(publishing_client, topic, msg, int(args.qos), args.clientid, intended_ns)
+wait_for_window(1)  # drain: wait for the last acks before disconnecting
+end_time = time.time()
+stats.stop()
+
+elapsed = max(end_time - start_time, 1e-9)
+print(
+    "Published "
+    + str(int(args.nummsgs))
+    + " messages in "
+    + "%.2f" % elapsed
+    + " seconds ("
+    + "%.2f" % (int(args.nummsgs) / elapsed)
+    + " msgs/sec)"
+)
+if pacer is not None:
+    print(
+        "Target rate: "
+        + args.rate
+        + " msgs/sec ("
+        + args.arrivals
+        + "), late sends: "
+        + str(pacer.late_sends)
+        + ", max schedule lag: "
+        + "%.3f" % (pacer.max_lag_ns / 1e6)
+        + " ms"
+    )
+    print("Ack latency from intended send time: " + ack_latency.format())
 
 publishing_client.disconnect()  # Disconnect from broker
 publishing_client.loop_stop()
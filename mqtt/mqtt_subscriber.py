@@ -12,6 +12,19 @@
 # Examples:
 #   python3 mqtt_subscriber.py --broker localhost --port 1884 --clientid py-sub-01 --qos 1 --cleansession false --topic test/topic
 #
+#   With end-to-end latency (publisher run with --latency 1):
+#   python3 mqtt_subscriber.py --broker localhost --port 1884 --clientid py-sub-01 --qos 1 --cleansession false --topic test/topic --latency true
+#
+#   With loss/duplicate/reorder detection (publisher run with --latency 1):
+#   python3 mqtt_subscriber.py --broker localhost --port 1884 --clientid py-sub-01 --qos 1 --cleansession false --topic test/topic --seqcheck true
+#
+#   Multiple and wildcard subscriptions, with throughput broken down by the first 4 topic levels:
+#   python3 mqtt_subscriber.py --broker localhost --port 1884 --clientid py-sub-01 --qos 1 --topic 'test/topic/l0_0/#' 'test/topic/+/l1_1/#' --prefix-depth 4
+#
+#   Headless (for automated benchmark runs): stop after 10000 messages, 5 minutes or 30 idle seconds, whichever
+#   comes first, and write the results as JSON:
+#   python3 mqtt_subscriber.py --broker localhost --port 1884 --clientid py-sub-01 --qos 1 --cleansession true --topic test/topic --latency true --expect 10000 --duration 300 --idle-timeout 30 --results results.json
+#
 # Windows Terminal:
 #   py ./mqtt_subscriber.py --broker localhost --port 1884 --clientid py-sub-01 --qos 1 --cleansession false --topic test/in
 #
@@ -22,12 +35,23 @@
 #
 #########################################################
 
-import sys
+import json
+import threading
 import paho.mqtt.client as mqtt  # import the subscribing_client
+from paho.mqtt.client import CallbackAPIVersion
 import time
-import logging, sys
+import logging
 import argparse
 
+from mqtt_metrics import (
+    LatencyHistogram,
+    SequenceTracker,
+    StatsReporter,
+    clock_ns,
+    parse_header,
+    topic_prefix,
+)
+
 
 def str2bool(v):
     if isinstance(v, bool):
@@ -46,15 +70,56 @@ parser.add_argument("--broker", help="MQTT Broker URL or IP")
 parser.add_argument("--port", help="MQTT Broker Port")
 parser.add_argument("--clientid", help="")
 parser.add_argument("--qos", help="")
-parser.add_argument("--cleansession", help="")
-parser.add_argument("--topic", help="")
+parser.add_argument("--cleansession", help="", default="true")
+parser.add_argument("--topic", nargs="+", help="One or more topic filters (+/# wildcards allowed)")
+parser.add_argument(
+    "--prefix-depth",
+    type=int,
+    default=0,
+    help="Break throughput down by the first N levels of each message's topic (default 0: off)",
+)
+parser.add_argument(
+    "--latency",
+    type=str2bool,
+    default=False,
+    help="Record publish-to-receive latency from payload headers (publisher run with --latency 1)",
+)
+parser.add_argument(
+    "--seqcheck",
+    type=str2bool,
+    default=False,
+    help="Count lost, duplicate and out-of-order messages per publisher from payload headers",
+)
+parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (headless)")
+parser.add_argument("--expect", type=int, default=0, help="Stop after N messages (headless)")
+parser.add_argument(
+    "--idle-timeout", type=float, default=0, help="Stop after N seconds without a message (headless)"
+)
+parser.add_argument(
+    "--stats-interval",
+    type=float,
+    default=5,
+    help="Print interval/cumulative throughput every N seconds (0 to disable, default 5)",
+)
+parser.add_argument(
+    "--debug", type=str2bool, default=False, help="Print a line for every message received"
+)
+parser.add_argument(
+    "--results", help="Write a JSON results document to this file at the end of the run ('-' for stdout)"
+)
 args = parser.parse_args()
 
 print(args)
 
 keepalive = 1200
 r_messages = []
-num_msgs_received = 0
+stats = StatsReporter("received", args.stats_interval)  # message/byte counters
+latency_histogram = LatencyHistogram()
+sequence_tracker = SequenceTracker()
+first_arrival = None  # wall-clock time of the first/last message
+last_arrival = None
+expected_received = threading.Event()
+prefix_counts = {}  # topic prefix -> [messages, bytes], with --prefix-depth
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -76,23 +141,172 @@ def on_message(subscribing_client, userdata, message):
     # m='Received message "' +msg +'" on topic "' + message.topic + '"'
     # print(m)
     # r_messages.append(msg)
-    global num_msgs_received  # we want to change the variable inside the funtion
-    num_msgs_received = num_msgs_received + 1
+    global first_arrival, last_arrival  # we want to change the variable inside the funtion
+    stats.messages += 1
+    stats.bytes += len(message.payload)
+    last_arrival = time.time()
+    if first_arrival is None:
+        first_arrival = last_arrival
+    if stats.messages == args.expect:
+        expected_received.set()
+    if args.prefix_depth:
+        prefix = topic_prefix(message.topic, args.prefix_depth)
+        counts = prefix_counts.get(prefix)
+        if counts is None:
+            counts = prefix_counts[prefix] = [0, 0]
+        counts[0] += 1
+        counts[1] += len(message.payload)
+    if args.latency or args.seqcheck:
+        header = parse_header(message.payload)
+        if header is not None:
+            if args.latency:
+                record_latency(header)
+            if args.seqcheck:
+                sequence_tracker.record(header[2], header[3])
+    if args.debug:
+        print("Received message #" + str(stats.messages) + " [" + str(len(message.payload)) + " byte(s)]")
+
+
+def record_latency(header):
+    clock, send_ns, _, _ = header
+    latency_histogram.record(clock_ns(clock) - send_ns)
+
+
+def print_latency_report():
+    if not latency_histogram.count:
+        print("No latency-stamped messages received")
+        return
+    s = latency_histogram.summary()
+    print(
+        "Latency (ms): p50="
+        + "%.3f" % s["p50"]
+        + " p90="
+        + "%.3f" % s["p90"]
+        + " p99="
+        + "%.3f" % s["p99"]
+        + " p99.9="
+        + "%.3f" % s["p99.9"]
+        + " max="
+        + "%.3f" % s["max"]
+        + " ("
+        + str(s["count"])
+        + " stamped message(s))"
+    )
+
+
+def arrival_window():
+    # Seconds from first to last arrival (0 if fewer than two messages)
+    if first_arrival is None:
+        return 0
+    return last_arrival - first_arrival
+
+
+def print_throughput_report():
+    elapsed = arrival_window()
+    if elapsed > 0:
+        print(
+            "Throughput: "
+            + "%.2f" % (stats.messages / elapsed)
+            + " msgs/sec, "
+            + "%.3f" % (stats.bytes / elapsed / (1024 * 1024))
+            + " MB/sec"
+        )
+
+
+def print_sequence_report():
+    totals = sequence_tracker.totals()
     print(
-        "Received message #" + str(num_msgs_received) + " [" + str(len(message.payload.decode("utf-8"))) + " byte(s)]"
+        "Sequence check: "
+        + str(totals["publishers"])
+        + " publisher(s), received="
+        + str(totals["received"])
+        + " lost="
+        + str(totals["lost"])
+        + " duplicates="
+        + str(totals["duplicates"])
+        + " reordered="
+        + str(totals["reordered"])
+        + " too_old="
+        + str(totals["too_old"])
+        + " restarts="
+        + str(totals["restarts"])
     )
+    for pub_id, counts in sequence_tracker.per_publisher().items():
+        if counts["lost"] or counts["duplicates"] or counts["reordered"] or counts["too_old"]:
+            print("  publisher " + pub_id + ": " + str(counts))
+
+
+def print_prefix_report(limit=50):
+    elapsed = arrival_window()
+    print("Throughput by topic prefix (" + str(len(prefix_counts)) + " prefixes):")
+    ranked = sorted(prefix_counts.items(), key=lambda item: item[1][0], reverse=True)
+    for prefix, (messages, nbytes) in ranked[:limit]:
+        line = "  " + prefix + ": " + str(messages) + " msgs, " + str(nbytes) + " bytes"
+        if elapsed > 0:
+            line += " (" + "%.2f" % (messages / elapsed) + " msgs/sec)"
+        print(line)
+    if len(ranked) > limit:
+        print("  ... " + str(len(ranked) - limit) + " more")
+
 
+def wait_for_stop():
+    # Headless run: block until a stop condition is met and return which one
+    start = time.time()
+    while True:
+        if expected_received.wait(0.1):
+            return "expect"
+        now = time.time()
+        if args.duration and now - start >= args.duration:
+            return "duration"
+        if args.idle_timeout and now - (last_arrival or start) >= args.idle_timeout:
+            return "idle-timeout"
 
-def sub(client, topic, qos, s_msg):
-    m = s_msg + " subscribing to topic=" + topic + " with qos=" + str(qos)
+
+def write_results(stop_reason):
+    elapsed = arrival_window()
+    results = {
+        "clientid": args.clientid,
+        "broker": args.broker,
+        "port": args.port,
+        "topic": args.topic,
+        "qos": args.qos,
+        "cleansession": args.cleansession,
+        "stop_reason": stop_reason,
+        "messages": stats.messages,
+        "bytes": stats.bytes,
+        "first_arrival": first_arrival,
+        "last_arrival": last_arrival,
+        "elapsed_seconds": elapsed,
+        "msgs_per_sec": stats.messages / elapsed if elapsed > 0 else None,
+        "mb_per_sec": stats.bytes / elapsed / (1024 * 1024) if elapsed > 0 else None,
+    }
+    if args.latency:
+        results["latency_ms"] = latency_histogram.summary()
+    if args.prefix_depth:
+        results["prefixes"] = {
+            prefix: {"messages": messages, "bytes": nbytes} for prefix, (messages, nbytes) in prefix_counts.items()
+        }
+    if args.seqcheck:
+        results["sequence"] = sequence_tracker.totals()
+        results["sequence_per_publisher"] = sequence_tracker.per_publisher()
+    if args.results == "-":
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Results written to " + args.results)
+
+
+def sub(client, topics, qos, s_msg):
+    m = s_msg + " subscribing to topic(s)=" + ", ".join(topics) + " with qos=" + str(qos)
     logging.info(m)
     # print(m)
-    client.subscribe(topic, qos)
-
+    client.subscribe([(topic, qos) for topic in topics])
 
-print(sys.argv[1] + " " + sys.argv[2] + " " + sys.argv[3] + " " + sys.argv[4] + " " + sys.argv[5] + " " + sys.argv[6])
 
-subscribing_client = mqtt.Client(args.clientid, clean_session=str2bool(args.cleansession))  # create new instance
+subscribing_client = mqtt.Client(
+    CallbackAPIVersion.VERSION1, args.clientid, clean_session=str2bool(args.cleansession)
+)  # create new instance
 
 # attache callback functions
 subscribing_client.on_message = on_message
@@ -101,13 +315,28 @@ subscribing_client.on_disconnect = on_disconnect
 
 print("Connecting with CLEAN_SESSION=", args.cleansession)
 subscribing_client.connect(args.broker, int(args.port), keepalive)
+stats.start()
 subscribing_client.loop_start()
 sub(subscribing_client, args.topic, int(args.qos), args.clientid)
-# time.sleep(3)                      # subscribe for x seconds then stop, or...
-inp = input("Waiting to continue:")  # press a key to stop subscribing
+if args.duration or args.expect or args.idle_timeout:
+    stop_reason = wait_for_stop()  # headless: stop on --duration/--expect/--idle-timeout
+else:
+    inp = input("Waiting to continue:")  # press a key to stop subscribing
+    stop_reason = "input"
+
+stats.stop()
 
 # print("Received " + str(len(r_messages)) + " message(s)");
-print("Received " + str(num_msgs_received) + " message(s)")
+print("Received " + str(stats.messages) + " message(s) (" + str(stats.bytes) + " bytes)")
+print_throughput_report()
+if args.latency:
+    print_latency_report()
+if args.seqcheck:
+    print_sequence_report()
+if args.prefix_depth:
+    print_prefix_report()
+if args.results:
+    write_results(stop_reason)
 
 subscribing_client.loop_stop()
 # stop checking buffer for inbound messages
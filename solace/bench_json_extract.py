@@ -0,0 +1,200 @@
+"""Microbenchmark: per-message cost of pulling the S3 key and data out of a track-measurement payload.
+
+Compares the extraction backends of synchronous_subscriber.py on generated
+RailTrackInspectionData documents: "json" (full stdlib parse and re-serialize, the old
+path), "scan" (parse all but the subtree, copy its text) and "orjson" (full parse with
+orjson, if installed). Each backend's output, and which malformed payloads it rejects,
+is checked against "json" first.
+Needs no broker or AWS credentials.
+
+Examples:
+    python bench_json_extract.py
+    python bench_json_extract.py --sizes 50 500 --subtree-share 0.5 --messages 200
+    python bench_json_extract.py --compact
+"""
+
+import argparse
+import json
+import random
+import time
+
+import synchronous_subscriber
+from synchronous_subscriber import SUBTREE_KEY, extract_fields, ndjson_line, orjson
+
+DEFAULT_SIZES = [5, 50, 500]
+DEFAULT_MESSAGES = 2000
+DEFAULT_SUBTREE_SHARE = 0.1
+
+
+def generate_payload(size_kb: int, subtree_share: float, seed: int = 0, compact: bool = False) -> bytes:
+    """A RailTrackInspectionData document of about size_kb, pretty-printed unless compact.
+
+    Survey and Localization Information holds about subtree_share of the samples; the
+    rest go into a sibling geometry measurement array.
+    """
+    rng = random.Random(seed)
+    num_samples = max(2, size_kb * 1024 // 190)
+    survey_samples = max(1, int(num_samples * subtree_share))
+
+    def sample(i):
+        return {
+            "Chainage": round(i * 0.25, 3),
+            "Latitude": round(-22.0 - rng.random(), 7),
+            "Longitude": round(118.0 + rng.random(), 7),
+            "Gauge": round(1435 + rng.uniform(-5, 5), 2),
+            "Cant": round(rng.uniform(-20, 20), 2),
+            "Status": rng.choice(["OK", "WARN", "EXCEEDANCE"]),
+        }
+
+    document = {
+        "RailTrackInspectionData": {
+            "Headers": {
+                "TransactionIdentity": {
+                    "MessageID": f"{rng.getrandbits(64):016x}",
+                    "RecordID": rng.randint(1, 10**9),
+                    "SourceSystem": "track-recording-car",
+                },
+                "CreatedAt": "2024-01-02T03:04:05Z",
+            },
+            "Data": {
+                SUBTREE_KEY: {
+                    "Run": rng.randint(1, 1000),
+                    "Line": "Newman-Port Hedland",
+                    "Samples": [sample(i) for i in range(survey_samples)],
+                },
+                "Track Geometry Measurements": [sample(i) for i in range(num_samples - survey_samples)],
+            },
+        }
+    }
+    return json.dumps(document, indent=None if compact else 2).encode("utf-8")
+
+
+def malformed_payloads() -> dict:
+    """Payloads that must be routed the same way by every backend, most of them to error/."""
+    text = generate_payload(5, 0.5, compact=True).decode("utf-8")
+    document = json.loads(text)
+    root = document["RailTrackInspectionData"]
+    subtree_end = text.index(', "Track Geometry Measurements"')
+
+    # Ids only inside the subtree, not in the header
+    ids_in_subtree = json.loads(text)
+    ids = ids_in_subtree["RailTrackInspectionData"]["Headers"].pop("TransactionIdentity")
+    ids_in_subtree["RailTrackInspectionData"]["Data"][SUBTREE_KEY]["TransactionIdentity"] = ids
+    # Subtree key under Headers instead of Data
+    misplaced = json.loads(text)
+    misplaced["RailTrackInspectionData"]["Headers"][SUBTREE_KEY] = misplaced["RailTrackInspectionData"]["Data"].pop(
+        SUBTREE_KEY
+    )
+    # Subtree key also used as a string value
+    key_as_value = json.loads(text)
+    key_as_value["RailTrackInspectionData"]["Headers"]["Comment"] = SUBTREE_KEY
+    # Subtree key nested a second time inside itself
+    nested = json.loads(text)
+    nested["RailTrackInspectionData"]["Data"][SUBTREE_KEY][SUBTREE_KEY] = {"Run": 1}
+    missing = json.loads(text)
+    del missing["RailTrackInspectionData"]["Data"][SUBTREE_KEY]
+
+    cases = {
+        "truncated after subtree": text[:subtree_end],
+        "truncated inside subtree": text[: subtree_end // 2],
+        "trailing garbage": text + " }",
+        "invalid JSON outside subtree": text.replace('"CreatedAt"', "CreatedAt", 1),
+        "ids only in subtree": json.dumps(ids_in_subtree),
+        "subtree under Headers": json.dumps(misplaced),
+        "subtree key as a value": json.dumps(key_as_value),
+        "nested subtree key": json.dumps(nested),
+        "subtree missing": json.dumps(missing),
+        "not an object": json.dumps([root]),
+    }
+    return {label: payload.encode("utf-8") for label, payload in cases.items()}
+
+
+def decoded_fields(payload: bytes, backend: str) -> list:
+    message_id, record_id, data = extract_fields(payload, backend)
+    return [message_id, record_id, json.loads(data)]
+
+
+def routed_fields(payload: bytes, backend: str):
+    """decoded_fields, or "error/" if parse_message would route the message there."""
+    try:
+        return decoded_fields(payload, backend)
+    except Exception:
+        return "error/"
+
+
+def bench(label: str, payloads: list, num_messages: int, backend: str) -> float:
+    start = time.perf_counter()
+    for i in range(num_messages):
+        message_id, record_id, data = extract_fields(payloads[i % len(payloads)], backend)
+        ndjson_line(message_id, record_id, data, backend)
+    per_message_us = (time.perf_counter() - start) / num_messages * 1e6
+    print(f"  {label:<8} {per_message_us:10.1f} us/msg")
+    return per_message_us
+
+
+def main(sizes: list, num_messages: int, subtree_share: float, variants: int, compact: bool = False):
+    backends = ["json", "scan"] + (["orjson"] if orjson is not None else [])
+    print(f"Backends: {', '.join(backends)} (auto would pick {synchronous_subscriber.json_backend('auto')})")
+
+    # Malformed payloads must land in the same place as with json
+    for label, payload in malformed_payloads().items():
+        expected = routed_fields(payload, "json")
+        for backend in backends:
+            assert routed_fields(payload, backend) == expected, f"{backend} routes '{label}' differently from json"
+    for size_kb in sizes:
+        payloads = [generate_payload(size_kb, subtree_share, seed, compact) for seed in range(variants)]
+        count = max(20, num_messages // max(1, size_kb // 10))
+        print(
+            f"{len(payloads[0]) / 1024:.0f} KB {'compact' if compact else 'pretty-printed'} payload, "
+            f"subtree share {subtree_share:g}, {count} messages:"
+        )
+
+        # Every backend must write the same JSON values as the full stdlib parse
+        for backend in backends:
+            for payload in payloads:
+                expected = decoded_fields(payload, "json")
+                assert decoded_fields(payload, backend) == expected, f"{backend} output differs from json"
+
+        baseline = None
+        for backend in backends:
+            result = bench(backend, payloads, count, backend)
+            if baseline is None:
+                baseline = result
+            else:
+                print(f"  {'':<8} {baseline / result:10.1f}x faster than json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Track-measurement JSON extraction microbenchmark")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Payload sizes in KB (default: 5 50 500)",
+    )
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=DEFAULT_MESSAGES,
+        help="Messages per measurement, scaled down for large payloads (default: 2000)",
+    )
+    parser.add_argument(
+        "--subtree-share",
+        type=float,
+        default=DEFAULT_SUBTREE_SHARE,
+        help="Fraction of the samples inside Survey and Localization Information (default: 0.1)",
+    )
+    parser.add_argument(
+        "--payload-variants",
+        type=int,
+        default=4,
+        help="Number of distinct payloads to rotate through (default: 4)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Generate single-line payloads instead of pretty-printed ones",
+    )
+    args = parser.parse_args()
+    main(args.sizes, args.messages, args.subtree_share, max(1, args.payload_variants), args.compact)
@@ -0,0 +1,388 @@
+"""Offline replay harness for the queue-to-S3 pipeline in synchronous_subscriber.py.
+
+Runs the pipeline's own receive loop (drain_queue) and sinks without a broker or AWS:
+ReplayReceiver replays a recorded message file, with optional redelivery and receive/ack
+failure injection, and MemoryS3Client or LocalS3Client stand in for boto3's S3 client,
+with optional put latency and failures. The bench command replays the same recording
+through each pipeline variant and reports msgs/sec and where the time went.
+
+Variants:
+    per-message  one JSON object per message, uploaded and acked inline (the original pipeline)
+    batched      S3BatchSink writing NDJSON batches inline
+    concurrent   S3BatchSink uploading batches on --workers threads, --inflight at a time
+
+A recording is NDJSON with one {"payload": "<base64>"} object per message.
+
+Examples:
+    python replay_harness.py generate --output recording.ndjson --messages 5000 --size 20
+    python replay_harness.py bench --recording recording.ndjson --s3-latency-ms 30
+    python replay_harness.py bench --recording recording.ndjson --variants batched concurrent --format ndjson.gz
+    python replay_harness.py bench --recording recording.ndjson --redelivery-rate 0.01 --put-failure-rate 0.05
+    python replay_harness.py bench --recording recording.ndjson --sink local --local-dir /tmp/s3
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import synchronous_subscriber
+from bench_json_extract import generate_payload
+from synchronous_subscriber import OUTPUT_FORMATS, S3BatchSink, drain_queue, upload_message_to_s3
+
+DEFAULT_BATCH_STRING = "2024/01/02/030405"
+DEFAULT_BUCKET = "replay-bucket"
+VARIANTS = ("per-message", "batched", "concurrent")
+REDELIVERY_DELAY = 100  # messages delivered before an injected redelivery comes back
+
+
+def write_recording(path: str, payloads):
+    with open(path, "w", encoding="ascii") as f:
+        for payload in payloads:
+            f.write(json.dumps({"payload": base64.b64encode(payload).decode("ascii")}) + "\n")
+
+
+def read_recording(path: str) -> list:
+    with open(path, "r", encoding="ascii") as f:
+        return [base64.b64decode(json.loads(line)["payload"]) for line in f if line.strip()]
+
+
+class ReplayMessage:
+    """The parts of InboundMessage the pipeline uses."""
+
+    def __init__(self, index: int, payload: bytes, redelivered: bool = False):
+        self.index = index
+        self.payload = payload
+        self.redelivered = redelivered
+
+    def get_payload_as_bytes(self):
+        return self.payload
+
+    def is_redelivered(self):
+        return self.redelivered
+
+
+class ReplayReceiver:
+    """Persistent receiver stand-in that delivers a recording once, then reports an empty queue.
+
+    redelivery_rate sends that share of messages a second time (flagged as redelivered)
+    about REDELIVERY_DELAY messages later; receive_failure_rate and ack_failure_rate make
+    receive_message() and ack() raise. Acks are tracked per message so a run can check
+    that every message was either acked or left on the queue.
+    """
+
+    def __init__(self, payloads: list, redelivery_rate=0.0, receive_failure_rate=0.0, ack_failure_rate=0.0, seed=0):
+        self.payloads = payloads
+        self.redelivery_rate = redelivery_rate
+        self.receive_failure_rate = receive_failure_rate
+        self.ack_failure_rate = ack_failure_rate
+        self.rng = random.Random(seed)
+        self.next_index = 0
+        self.redeliveries = deque()
+        self.delivered = 0
+        self.redelivered = 0
+        self.receive_failures = 0
+        self.ack_failures = 0
+        self.acks = 0
+        self.acked = set()
+
+    def receive_message(self, timeout_ms=None):
+        if self.receive_failure_rate and self.rng.random() < self.receive_failure_rate:
+            self.receive_failures += 1
+            raise RuntimeError("injected receive failure")
+        if self.redeliveries and (
+            len(self.redeliveries) > REDELIVERY_DELAY or self.next_index >= len(self.payloads)
+        ):
+            index = self.redeliveries.popleft()
+            self.redelivered += 1
+            return ReplayMessage(index, self.payloads[index], redelivered=True)
+        if self.next_index >= len(self.payloads):
+            return None
+        index = self.next_index
+        self.next_index += 1
+        self.delivered += 1
+        if self.redelivery_rate and self.rng.random() < self.redelivery_rate:
+            self.redeliveries.append(index)
+        return ReplayMessage(index, self.payloads[index])
+
+    def ack(self, message: ReplayMessage):
+        if self.ack_failure_rate and self.rng.random() < self.ack_failure_rate:
+            self.ack_failures += 1
+            raise RuntimeError("injected ack failure")
+        self.acks += 1
+        self.acked.add(message.index)
+
+
+class MemoryS3Client:
+    """put_object stand-in that keeps objects in a dict, with optional latency and failures.
+
+    Safe to call from the concurrent variant's upload threads.
+    """
+
+    def __init__(self, latency_ms=0.0, failure_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.puts = 0
+        self.failures = 0
+        self.bytes = 0
+
+    def put_object(self, Body, Bucket, Key, ServerSideEncryption=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        body = Body.encode("utf-8") if isinstance(Body, str) else Body
+        with self.lock:
+            if self.failure_rate and self.rng.random() < self.failure_rate:
+                self.failures += 1
+                raise RuntimeError("injected put_object failure")
+            self.puts += 1
+            self.bytes += len(body)
+        self.store(Bucket, Key, body)
+
+    def store(self, bucket, key, body):
+        with self.lock:
+            self.objects[(bucket, key)] = body
+
+
+class LocalS3Client(MemoryS3Client):
+    """MemoryS3Client that writes each object to <root>/<bucket>/<key> instead."""
+
+    def __init__(self, root: str, latency_ms=0.0, failure_rate=0.0, seed=0):
+        super().__init__(latency_ms, failure_rate, seed)
+        self.root = root
+
+    def store(self, bucket, key, body):
+        path = os.path.join(self.root, bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+
+
+class PerMessageSink:
+    """The pipeline before batching: upload each message as its own object, then ack it."""
+
+    max_age_seconds = 10
+
+    def __init__(self, s3_client, bucket_name, batch_string, receiver):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.batch_string = batch_string
+        self.receiver = receiver
+        self.acked = 0
+
+    def add(self, message, message_number):
+        upload_message_to_s3(self.bucket_name, message, self.s3_client, self.batch_string, message_number)
+        self.receiver.ack(message)
+        self.acked += 1
+
+    def flush_if_due(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StageTimer:
+    """Total time per pipeline stage, from any thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.calls = {}
+
+    def wrap(self, stage: str, function):
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                with self.lock:
+                    self.totals[stage] = self.totals.get(stage, 0) + elapsed
+                    self.calls[stage] = self.calls.get(stage, 0) + 1
+
+        return timed
+
+
+def make_sink(variant: str, args, s3_client, receiver):
+    if variant == "per-message":
+        return PerMessageSink(s3_client, DEFAULT_BUCKET, args.batch_string, receiver)
+    workers = args.workers if variant == "concurrent" else 0
+    return S3BatchSink(
+        s3_client,
+        DEFAULT_BUCKET,
+        args.batch_string,
+        receiver,
+        args.batch_messages,
+        args.batch_bytes,
+        args.batch_age,
+        workers,
+        args.inflight,
+        args.backend,
+        args.format,
+    )
+
+
+def run_variant(variant: str, payloads: list, args) -> dict:
+    receiver = ReplayReceiver(
+        payloads, args.redelivery_rate, args.receive_failure_rate, args.ack_failure_rate, args.seed
+    )
+    if args.sink == "local":
+        s3_client = LocalS3Client(
+            os.path.join(args.local_dir, variant), args.s3_latency_ms, args.put_failure_rate, args.seed
+        )
+    else:
+        s3_client = MemoryS3Client(args.s3_latency_ms, args.put_failure_rate, args.seed)
+
+    # Time each stage by wrapping the receiver, the S3 client and the module-level
+    # functions the sinks call; upload-thread stages add up across threads
+    timer = StageTimer()
+    receiver.receive_message = timer.wrap("receive", receiver.receive_message)
+    receiver.ack = timer.wrap("ack", receiver.ack)
+    s3_client.put_object = timer.wrap("put", s3_client.put_object)
+    patched = {name: getattr(synchronous_subscriber, name) for name in ("parse_message", "encode_batch")}
+    stages = {"parse_message": "parse", "encode_batch": "encode"}
+    for name, function in patched.items():
+        setattr(synchronous_subscriber, name, timer.wrap(stages[name], function))
+
+    sink = make_sink(variant, args, s3_client, receiver)
+    start = time.perf_counter()
+    try:
+        received = drain_queue(receiver, sink, time.time(), float("inf"), stop_when_idle=True)
+        sink.close()
+    finally:
+        for name, function in patched.items():
+            setattr(synchronous_subscriber, name, function)
+    wall = time.perf_counter() - start
+
+    return {
+        "variant": variant,
+        "wall": wall,
+        "received": received,
+        "receiver": receiver,
+        "s3": s3_client,
+        "timer": timer,
+        "total": len(payloads),
+    }
+
+
+def report(result: dict):
+    receiver, s3_client, timer, wall = result["receiver"], result["s3"], result["timer"], result["wall"]
+    unacked = result["total"] - len(receiver.acked)
+    print(
+        f"{result['variant']}: {len(receiver.acked) / wall:.1f} msgs/sec "
+        f"({len(receiver.acked)}/{result['total']} acked in {wall:.2f} s, {unacked} left on the queue)"
+    )
+    print(
+        f"  received {result['received']} (redelivered {receiver.redelivered}), acks {receiver.acks}, "
+        f"S3 objects {s3_client.puts} ({s3_client.bytes / 1024:.1f} KB), "
+        f"injected failures: receive {receiver.receive_failures}, put {s3_client.failures}, ack {receiver.ack_failures}"
+    )
+    for stage in ("receive", "parse", "encode", "put", "ack"):
+        if stage not in timer.totals:
+            continue
+        total = timer.totals[stage] / 1e9
+        calls = timer.calls[stage]
+        print(
+            f"  {stage:<8} {total:8.3f} s {100 * total / wall:6.1f}% of wall time, "
+            f"{total / calls * 1e6:9.1f} us/call over {calls} call(s)"
+        )
+
+
+def main_generate(args):
+    payloads = (generate_payload(args.size, args.subtree_share, seed, args.compact) for seed in range(args.messages))
+    write_recording(args.output, payloads)
+    print(f"Wrote {args.messages} message(s) of ~{args.size} KB to {args.output}")
+
+
+def main_bench(args):
+    payloads = read_recording(args.recording)
+    print(
+        f"Replaying {len(payloads)} message(s) from {args.recording} into a {args.sink} S3 stand-in "
+        f"({args.s3_latency_ms} ms per put), format {args.format}, JSON backend {args.backend}"
+    )
+    print("Stage times on upload threads are summed across threads and can exceed the wall time")
+    for variant in args.variants:
+        report(run_variant(variant, payloads, args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline replay harness for the Solace-to-S3 pipeline")
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the pipeline's [LAMBDA LOG] output, including injected failures",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Write a recording of synthetic track-measurement messages")
+    generate.add_argument("--output", type=str, required=True, help="Recording file to write")
+    generate.add_argument("--messages", type=int, default=2000, help="Number of messages (default: 2000)")
+    generate.add_argument("--size", type=int, default=20, help="Payload size in KB (default: 20)")
+    generate.add_argument(
+        "--subtree-share",
+        type=float,
+        default=0.1,
+        help="Fraction of the samples inside Survey and Localization Information (default: 0.1)",
+    )
+    generate.add_argument("--compact", action="store_true", help="Single-line payloads instead of pretty-printed")
+
+    bench = subparsers.add_parser("bench", help="Replay a recording through pipeline variants and compare them")
+    bench.add_argument("--recording", type=str, required=True, help="Recording file to replay")
+    bench.add_argument(
+        "--variants",
+        type=str,
+        nargs="+",
+        choices=VARIANTS,
+        default=list(VARIANTS),
+        help="Pipeline variants to run (default: all)",
+    )
+    bench.add_argument(
+        "--sink",
+        type=str,
+        choices=["memory", "local"],
+        default="memory",
+        help="S3 stand-in: keep objects in memory or write them under --local-dir (default: memory)",
+    )
+    bench.add_argument("--local-dir", type=str, default="replay-s3", help="Root directory for --sink local")
+    bench.add_argument("--s3-latency-ms", type=float, default=20, help="Simulated put_object latency (default: 20)")
+    bench.add_argument("--put-failure-rate", type=float, default=0, help="Share of put_object calls that fail")
+    bench.add_argument("--receive-failure-rate", type=float, default=0, help="Share of receive calls that fail")
+    bench.add_argument("--ack-failure-rate", type=float, default=0, help="Share of acks that fail")
+    bench.add_argument("--redelivery-rate", type=float, default=0, help="Share of messages delivered twice")
+    bench.add_argument("--seed", type=int, default=0, help="Seed for failure and redelivery injection (default: 0)")
+    bench.add_argument("--batch-string", type=str, default=DEFAULT_BATCH_STRING, help="Airflow batch string")
+    bench.add_argument("--batch-messages", type=int, default=500, help="Messages per batch (default: 500)")
+    bench.add_argument("--batch-bytes", type=int, default=8 * 1024 * 1024, help="Bytes per batch (default: 8 MiB)")
+    bench.add_argument("--batch-age", type=float, default=5, help="Max batch age in seconds (default: 5)")
+    bench.add_argument("--workers", type=int, default=4, help="Upload threads for concurrent (default: 4)")
+    bench.add_argument("--inflight", type=int, default=4, help="Batches uploading at once for concurrent (default: 4)")
+    bench.add_argument(
+        "--format",
+        type=str,
+        choices=OUTPUT_FORMATS,
+        default="ndjson",
+        help="Batch object format (default: ndjson)",
+    )
+    bench.add_argument(
+        "--backend",
+        type=str,
+        choices=["auto", "scan", "orjson", "json"],
+        default="auto",
+        help="JSON extraction backend (default: auto)",
+    )
+
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+    if args.command == "generate":
+        main_generate(args)
+    else:
+        main_bench(args)
@@ -0,0 +1,96 @@
+"""Microbenchmark: per-message build cost of the publish loop, before and after MessageTemplates.
+
+"rebuild" is the old loop body (fresh id string, property map and payload copy for
+every message); "template" reuses one prebuilt message per payload variant and
+only sets the sequence number. Needs no broker: the messaging service is built but
+never connected.
+
+Examples:
+    python bench_message_build.py
+    python bench_message_build.py --sizes 1 100 --messages 50000
+"""
+
+import argparse
+import time
+
+from solace.messaging.messaging_service import MessagingService
+
+from smf_metrics import MessageTemplates
+from solace_loadtest_publisher_json import MESSAGE_PROPERTIES, generate_random_json
+
+DEFAULT_SIZES = [1, 10, 100, 1000]
+DEFAULT_MESSAGES = 20000
+
+
+def bench(label: str, num_messages: int, build) -> float:
+    start = time.perf_counter()
+    for i in range(num_messages):
+        build(i)
+    per_message_us = (time.perf_counter() - start) / num_messages * 1e6
+    print(f"  {label:<8} {per_message_us:8.2f} us/msg")
+    return per_message_us
+
+
+def main(sizes: list, num_messages: int, variants: int):
+    # Unconnected service: message builders don't need a broker session
+    messaging_service = (
+        MessagingService.builder()
+        .from_properties(
+            {
+                "solace.messaging.transport.host": "tcp://127.0.0.1:55555",
+                "solace.messaging.service.vpn-name": "default",
+                "solace.messaging.authentication.scheme.basic.username": "default",
+                "solace.messaging.authentication.scheme.basic.password": "default",
+            }
+        )
+        .build()
+    )
+
+    for size_kb in sizes:
+        payloads = [generate_random_json(size_kb, seed) for seed in range(variants)]
+        count = max(1000, num_messages // max(1, size_kb // 10))
+        print(f"{size_kb} KB payload, {variants} variant(s), {count} messages:")
+
+        message_builder = messaging_service.message_builder()
+        before = bench(
+            "rebuild",
+            count,
+            lambda i: message_builder.with_application_message_id(f"loadtest-json-{i}")
+            .with_property("content_type", "application/json")
+            .from_properties(MESSAGE_PROPERTIES)
+            .build(payloads[i % len(payloads)]),
+        )
+
+        template_builder = (
+            messaging_service.message_builder()
+            .with_application_message_id("loadtest-json")
+            .with_property("content_type", "application/json")
+            .from_properties(MESSAGE_PROPERTIES)
+        )
+        after = bench("template", count, MessageTemplates(template_builder, payloads).next)
+        print(f"  template is {before / after:.1f}x faster than rebuild")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solace message build microbenchmark")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Payload sizes in KB (default: 1 10 100 1000)",
+    )
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=DEFAULT_MESSAGES,
+        help="Messages per measurement, scaled down for large payloads (default: 20000)",
+    )
+    parser.add_argument(
+        "--payload-variants",
+        type=int,
+        default=1,
+        help="Number of distinct JSON payloads to rotate through (default: 1)",
+    )
+    args = parser.parse_args()
+    main(args.sizes, args.messages, max(1, args.payload_variants))
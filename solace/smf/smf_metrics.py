@@ -0,0 +1,395 @@
+"""Measurement and publishing helpers shared by the Solace SMF load test scripts.
+
+Import from a script in this directory, e.g.:
+
+    from smf_metrics import LatencyHistogram, RatePacer, StatsReporter
+
+LatencyHistogram, RatePacer, SequenceTracker and StatsReporter live in
+../../common/loadtest_metrics.py, shared with the MQTT scripts, and are re-exported here.
+"""
+
+import csv
+import gc
+import os
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+
+from solace.messaging.errors.pubsubplus_client_error import PublisherOverflowError
+from solace.messaging.publisher.publisher_health_check import PublisherReadinessListener
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from loadtest_metrics import (  # noqa: E402, F401
+    PERCENTILES,
+    LatencyHistogram,
+    RatePacer,
+    SequenceTracker,
+    StatsReporter,
+)
+
+# User properties stamped on each message for end-to-end latency and loss detection.
+# Publisher id and clock name are constant per run and go on the message template.
+SEND_TIME_PROPERTY = "loadtest_send_ns"
+SEQUENCE_PROPERTY = "loadtest_seq"
+PUBLISHER_PROPERTY = "loadtest_publisher"
+CLOCK_PROPERTY = "loadtest_clock"
+LATENCY_CLOCKS = {"monotonic": time.monotonic_ns, "wall": time.time_ns}
+BACK_PRESSURE_STRATEGIES = ("reject", "wait", "elastic")
+DEFAULT_PUBLISH_BUFFER = 1000
+
+
+class StageProfiler:
+    """Splits a publish loop's wall time into stages, one LatencyHistogram per stage.
+
+    The loop calls lap(stage) at the end of each stage; the time since the previous
+    lap (or start()) is recorded against that stage. Time between laps that no stage
+    claims, such as loop overhead and the profiler itself, is reported as "other".
+    A lap costs about a microsecond and a half, so enable it only when asked.
+    """
+
+    STAGES = ("build", "publish", "sleep", "logging")
+
+    def __init__(self, stages=STAGES):
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self._start = None
+        self._last = None
+        self._end = None
+
+    def start(self):
+        self._start = self._last = time.perf_counter_ns()
+        return self
+
+    def lap(self, stage: str):
+        now = time.perf_counter_ns()
+        self.histograms[stage].record(now - self._last)
+        self._last = now
+
+    def stop(self):
+        self._end = time.perf_counter_ns()
+
+    def report(self) -> list:
+        """One line per stage: per-call percentiles (us) and share of the loop's wall time."""
+        wall = max((self._end or time.perf_counter_ns()) - self._start, 1)
+        lines = []
+        claimed = 0
+        for stage, histogram in self.histograms.items():
+            claimed += histogram.total
+            lines.append(
+                f"  {stage:<8} {100 * histogram.total / wall:5.1f}% of wall time, "
+                f"per call {histogram.format(scale=1e3, unit='us')}"
+            )
+        lines.append(f"  {'other':<8} {100 * max(wall - claimed, 0) / wall:5.1f}% of wall time")
+        return lines
+
+
+class AdaptiveRate:
+    """Drives a RatePacer up to the highest rate the publisher sustains without back-pressure.
+
+    Call update() after every send with whether it hit back-pressure. Every `step`
+    seconds the rate is multiplied by `ramp` while no back-pressure has been seen.
+    A step with back-pressure drops the rate to `hold` of its current value and
+    halves the ramp-up (down to a 1% creep), so the rate settles just below the
+    point where back-pressure starts.
+    """
+
+    MIN_RAMP = 1.01
+
+    def __init__(self, pacer: RatePacer, start_rate: float, step: float = 1.0, ramp: float = 1.1, hold: float = 0.9):
+        self.pacer = pacer
+        self.rate = start_rate
+        self.step = step
+        self.ramp = ramp
+        self.hold = hold
+        self.backoffs = 0
+        self.best_rate = 0  # highest rate held for a whole step without back-pressure
+        self._step_start = time.monotonic()
+        self._pressured = False
+
+    def update(self, pressured: bool):
+        self._pressured |= pressured
+        now = time.monotonic()
+        if now - self._step_start < self.step:
+            return
+        if self._pressured:
+            self.backoffs += 1
+            self.rate *= self.hold
+        else:
+            self.best_rate = max(self.best_rate, self.rate)
+            self.rate *= max(1 + (self.ramp - 1) / 2**self.backoffs, self.MIN_RAMP)
+        self.pacer.set_rate(self.rate)
+        self._step_start = now
+        self._pressured = False
+
+
+def with_back_pressure(builder, strategy: str, buffer: int = DEFAULT_PUBLISH_BUFFER):
+    """Apply a back-pressure strategy ("reject", "wait" or "elastic") to a publisher builder."""
+    if strategy == "reject":
+        return builder.on_back_pressure_reject(buffer)
+    if strategy == "wait":
+        return builder.on_back_pressure_wait(buffer)
+    if strategy == "elastic":
+        return builder.on_back_pressure_elastic()
+    raise ValueError(f"unknown back-pressure strategy: {strategy}")
+
+
+class BackPressureHandler(PublisherReadinessListener):
+    """Publishes through a started publisher, riding out back-pressure instead of failing.
+
+    A send rejected with PublisherOverflowError (reject strategy) is retried once the
+    API reports the publisher ready again. A send made while the publisher's buffer
+    was full (it would block under the wait strategy) or that needed retries counts
+    as a blocked send, and its whole duration is added to blocked_ns. publish()
+    returns True for such sends.
+
+    It registers itself as the publisher's readiness listener, so create one per
+    publisher; threads sharing a publisher can share its handler.
+    """
+
+    def __init__(self, publisher):
+        self.publisher = publisher
+        self.rejects = 0
+        self.blocked_sends = 0
+        self.blocked_ns = 0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        publisher.set_publisher_readiness_listener(self)
+
+    def ready(self):
+        self._ready.set()
+
+    def publish(self, message, topic, **kwargs) -> bool:
+        blocked = not self.publisher.is_ready()
+        start = time.monotonic_ns()
+        while True:
+            try:
+                self.publisher.publish(message, topic, **kwargs)
+                break
+            except PublisherOverflowError:
+                with self._lock:
+                    self.rejects += 1
+                blocked = True
+                # ready() is only guaranteed to follow a notify_when_ready() request
+                self._ready.clear()
+                self.publisher.notify_when_ready()
+                self._ready.wait(1.0)
+        if blocked:
+            with self._lock:
+                self.blocked_sends += 1
+                self.blocked_ns += time.monotonic_ns() - start
+        return blocked
+
+    def format(self):
+        return (
+            f"rejects={self.rejects} blocked sends={self.blocked_sends} "
+            f"time blocked={self.blocked_ns / 1e9:.3f} s"
+        )
+
+
+class MessageTemplates:
+    """One prebuilt outbound message per payload variant, with only the sequence number changing.
+
+    Building a message applies the property map and copies the payload every time;
+    here each payload is built once. publish() takes its own core-level duplicate
+    of the message before it returns (the duplicate shares the payload data block),
+    so the same template can be handed to every send: next(seq) only sets its
+    sequence number. A template must not be shared by threads publishing
+    concurrently; give each thread its own MessageTemplates.
+    """
+
+    def __init__(self, builder, payloads: list):
+        self.templates = [builder.build(payload) for payload in payloads]
+        self.index = 0
+
+    def next(self, seq: int):
+        message = self.templates[self.index]
+        self.index = (self.index + 1) % len(self.templates)
+        message.solace_message.set_message_sequence_number(seq)
+        return message
+
+
+def new_publisher_id() -> str:
+    """Id that tells concurrent publisher runs apart in SequenceTracker."""
+    return f"{socket.gethostname()}-{os.getpid()}-{random.getrandbits(32):08x}"
+
+
+def latency_template_properties(publisher_id: str, clock: str) -> dict:
+    """Per-run properties to apply once to the message builder (see latency_properties)."""
+    return {PUBLISHER_PROPERTY: publisher_id, CLOCK_PROPERTY: clock}
+
+
+def clock_offset_ns(clock: str) -> int:
+    """What to add to a time.monotonic_ns() value (e.g. a RatePacer due time) to put it on `clock`."""
+    return 0 if clock == "monotonic" else LATENCY_CLOCKS[clock]() - time.monotonic_ns()
+
+
+def latency_properties(seq: int, clock: str, due_ns: int = None, offset_ns: int = 0) -> dict:
+    """Per-message properties for publish(..., additional_message_properties=...).
+
+    The send time is now, or with a RatePacer the intended send time due_ns
+    (monotonic, moved onto `clock` by offset_ns from clock_offset_ns()), so that
+    end-to-end latency includes any time the publisher fell behind its schedule.
+    The publisher applies the properties to its own copy of the message, so a
+    MessageTemplates template is left unchanged.
+    """
+    send_ns = LATENCY_CLOCKS[clock]() if due_ns is None else due_ns + offset_ns
+    return {SEND_TIME_PROPERTY: send_ns, SEQUENCE_PROPERTY: seq}
+
+
+class LatencyRecorder:
+    """Subscriber side of the latency properties: records age and sequence per message.
+
+    record() returns False for messages that don't carry the properties (e.g. from a
+    publisher run without latency stamping); those are only counted as unstamped.
+    """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.sequences = SequenceTracker()
+        self.unstamped = 0
+
+    def record(self, message) -> bool:
+        send_ns = message.get_property(SEND_TIME_PROPERTY)
+        if send_ns is None:
+            self.unstamped += 1
+            return False
+        clock = LATENCY_CLOCKS.get(message.get_property(CLOCK_PROPERTY), time.time_ns)
+        self.latency.record(clock() - send_ns)
+        self.sequences.record(message.get_property(PUBLISHER_PROPERTY), message.get_property(SEQUENCE_PROPERTY) or 0)
+        return True
+
+
+def read_rss_kb() -> int:
+    """Current resident set size in KB (Linux /proc), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def read_thread_count() -> int:
+    """OS threads in this process (includes the Solace API's native threads on Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return threading.active_count()
+
+
+class SoakMonitor:
+    """Samples resources and interval throughput into a CSV time series for long runs.
+
+    Every `interval` seconds a row with RSS, CPU, GC collections, thread count and
+    the msgs/sec of `stats` since the previous row is appended (and flushed) to
+    `path`, so a run that dies still leaves its history. regressions() compares the
+    first and last quarters of the run to flag throughput decay and steady memory
+    or thread growth.
+    """
+
+    FIELDS = (
+        "time", "elapsed_s", "messages", "msgs_per_sec", "rss_kb", "cpu_percent",
+        "gc_gen0", "gc_gen1", "gc_gen2", "threads",
+    )
+    THROUGHPUT_DROP = 0.10  # flag when the last quarter is this much slower than the first
+    MEMORY_GROWTH = 0.05  # flag when RSS rises every quarter and by this much overall
+    MIN_SAMPLES = 8
+
+    def __init__(self, stats: "StatsReporter", path: str, interval: float = 30.0):
+        self.stats = stats
+        self.path = path
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._writer = None
+        self._last = None
+
+    def start(self):
+        self._file = open(self.path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.FIELDS)
+        self._file.flush()
+        self._last = (time.monotonic(), time.process_time(), self.stats.totals()[0])
+        self._start = self._last[0]
+        self._thread = threading.Thread(target=self._run, name="soak-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.sample()
+            self._file.close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        now, cpu, messages = time.monotonic(), time.process_time(), self.stats.totals()[0]
+        last_time, last_cpu, last_messages = self._last
+        self._last = (now, cpu, messages)
+        elapsed = max(now - last_time, 1e-9)
+        gen0, gen1, gen2 = (generation["collections"] for generation in gc.get_stats())
+        row = (
+            time.strftime("%Y-%m-%dT%H:%M:%S"), round(now - self._start, 1), messages,
+            round((messages - last_messages) / elapsed, 1), read_rss_kb(),
+            round(100 * (cpu - last_cpu) / elapsed, 1), gen0, gen1, gen2, read_thread_count(),
+        )
+        self.samples.append(dict(zip(self.FIELDS, row)))
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def regressions(self) -> list:
+        """Human-readable findings; empty when the run looks stable or is too short to judge."""
+        if len(self.samples) < self.MIN_SAMPLES:
+            return []
+        # Skip the first sample: it includes connect/warm-up
+        samples = self.samples[1:]
+        quarter = len(samples) // 4
+        quarters = [samples[q * quarter : (q + 1) * quarter] for q in range(4)]
+
+        def mean(rows, key):
+            return sum(row[key] for row in rows) / len(rows)
+
+        findings = []
+        first_rate, last_rate = mean(quarters[0], "msgs_per_sec"), mean(quarters[3], "msgs_per_sec")
+        if first_rate > 0 and last_rate < first_rate * (1 - self.THROUGHPUT_DROP):
+            findings.append(
+                f"throughput dropped {100 * (1 - last_rate / first_rate):.1f}% "
+                f"({first_rate:.1f} -> {last_rate:.1f} msgs/sec, first vs last quarter)"
+            )
+        rss = [mean(q, "rss_kb") for q in quarters]
+        if all(a < b for a, b in zip(rss, rss[1:])) and rss[3] > rss[0] * (1 + self.MEMORY_GROWTH):
+            hours = max(samples[-1]["elapsed_s"] - samples[0]["elapsed_s"], 1e-9) / 3600
+            findings.append(
+                f"memory grew every quarter: RSS {rss[0] / 1024:.1f} -> {rss[3] / 1024:.1f} MB "
+                f"(~{(samples[-1]['rss_kb'] - samples[0]['rss_kb']) / 1024 / hours:.1f} MB/hour)"
+            )
+        threads = [mean(q, "threads") for q in quarters]
+        if all(a < b for a, b in zip(threads, threads[1:])):
+            findings.append(f"thread count grew every quarter: {threads[0]:.0f} -> {threads[3]:.0f}")
+        return findings
+
+    def report(self):
+        print(f"Soak time series: {len(self.samples)} samples every {self.interval} seconds in {self.path}")
+        if len(self.samples) < self.MIN_SAMPLES:
+            print(f"[soak] only {len(self.samples)} samples; regression checks need {self.MIN_SAMPLES}")
+            return
+        findings = self.regressions()
+        for finding in findings:
+            print(f"[soak] REGRESSION? {finding}")
+        if not findings:
+            print("[soak] no throughput drop, memory growth or thread growth detected")
+
+
+def default_soak_path(label: str) -> str:
+    return f"soak-{label}-{time.strftime('%Y%m%d-%H%M%S')}.csv"
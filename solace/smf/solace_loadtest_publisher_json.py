@@ -1,5 +1,5 @@
 import argparse
-import json
+import itertools
 import os
 import random
 import string
@@ -8,6 +8,26 @@ import time
 from solace.messaging.messaging_service import MessagingService
 from solace.messaging.resources.topic import Topic
 
+from smf_metrics import (
+    BACK_PRESSURE_STRATEGIES,
+    DEFAULT_PUBLISH_BUFFER,
+    AdaptiveRate,
+    LATENCY_CLOCKS,
+    BackPressureHandler,
+    LatencyHistogram,
+    MessageTemplates,
+    RatePacer,
+    SoakMonitor,
+    StageProfiler,
+    StatsReporter,
+    clock_offset_ns,
+    default_soak_path,
+    latency_properties,
+    latency_template_properties,
+    new_publisher_id,
+    with_back_pressure,
+)
+
 # Default configuration
 DEFAULT_BROKER = "tcp://localhost:55555"
 DEFAULT_VPN = "default"
@@ -18,52 +38,78 @@ DEFAULT_PASSWORD = "default"
 DEFAULT_TOPIC = "solace/loadtest/topic"
 DEFAULT_VOLUME = 1000
 DEFAULT_DELAY = 0.001
+DEFAULT_STATS_INTERVAL = 5.0
+DEFAULT_ADAPTIVE_START_RATE = 1000  # msgs/sec when --adaptive is given without --rate
 MESSAGE_PROPERTIES = {"app_id": "loadtest"}  # Optional custom SMF properties
 
 
-def generate_random_json(target_size_kb: int) -> str:
-    """Generate a random JSON string approximately matching the target size in KB."""
+JSON_SHAPE_VERSION = 2  # Bump when the generated document layout changes; invalidates cached payloads
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "solace-loadtest")
+CHARS = (string.ascii_letters + string.digits).encode("ascii")
+CHAR_TABLE = bytes(CHARS[i % len(CHARS)] for i in range(256))  # maps any byte to a random-string char
+
+
+def generate_random_json(target_size_kb: int, seed: int = None) -> str:
+    """Generate a random JSON string of exactly the target size in KB.
+
+    The random characters and numbers for all items come from one bulk randbytes()
+    call, and the document is assembled as text (with json.dumps' separators) while
+    tracking its length, so the size is exact without re-serializing. Trailing space
+    padding in a "padding" field makes up the last few bytes.
+    """
     target_size_bytes = target_size_kb * 1024  # Convert KB to bytes
-    base_data = {
-        "id": str(random.randint(1, 1000000)),
-        "timestamp": time.time(),
-        "data": [],
-    }
+    rng = random.Random(seed)
+    head = f'{{"id": "{rng.randint(1, 1000000)}", "timestamp": {time.time()!r}, "data": ['
+    tail = '], "padding": ""}'
+    size = len(head) + len(tail)
 
-    # Generate random strings to fill the data array
-    chars = string.ascii_letters + string.digits
-    item_size = 100  # Approx size of each array item in bytes
-    num_items = (
-        target_size_bytes - 100
-    ) // item_size  # Reserve ~100 bytes for base structure
-
-    for _ in range(num_items):
-        random_string = "".join(
-            random.choice(chars) for _ in range(80)
-        )  # ~80 bytes per string
-        base_data["data"].append(
-            {
-                "value": random_string,
-                "index": random.randint(1, 1000),
-                "flag": random.choice([True, False]),
-            }
-        )
+    item_size = 100  # Approx size of each array item in bytes, so we overshoot a little
+    num_items = max(0, (target_size_bytes - size) // item_size + 1)
+    values = rng.randbytes(num_items * 80).translate(CHAR_TABLE).decode("ascii")  # ~80 bytes per string
+    numbers = rng.randbytes(num_items * 3)  # 2 bytes for index, 1 for flag
+
+    items = []
+    for k in range(num_items):
+        index = int.from_bytes(numbers[3 * k : 3 * k + 2], "big") % 1000 + 1
+        flag = "true" if numbers[3 * k + 2] & 1 else "false"
+        item = f'{{"value": "{values[80 * k : 80 * k + 80]}", "index": {index}, "flag": {flag}}}'
+        item_len = len(item) + (2 if items else 0)  # ", " separator
+        if size + item_len > target_size_bytes:
+            break
+        items.append(item)
+        size += item_len
+
+    padding = " " * max(0, target_size_bytes - size)
+    return head + ", ".join(items) + '], "padding": "' + padding + '"}'
 
-    # Serialize to JSON
-    json_str = json.dumps(base_data)
 
-    # Adjust size by trimming or padding
-    current_size = len(json_str.encode("utf-8"))
-    if current_size < target_size_bytes:
-        padding = " " * (target_size_bytes - current_size - 50)  # Conservative padding
-        base_data["padding"] = padding
-        json_str = json.dumps(base_data)
-    elif current_size > target_size_bytes:
-        excess_items = (current_size - target_size_bytes) // item_size + 1
-        base_data["data"] = base_data["data"][:-excess_items]
-        json_str = json.dumps(base_data)
+def load_json_payloads(size_kb: int, variants: int, seed: int, cache_dir: str = None) -> list:
+    """Return `variants` distinct JSON payloads, reading/writing them from an on-disk cache.
 
-    return json_str
+    Cache files are keyed by size, document shape version and seed (seed + n for the
+    n-th variant), so a repeat run with the same settings skips generation entirely.
+    """
+    payloads = []
+    for variant in range(variants):
+        variant_seed = seed + variant
+        path = None
+        if cache_dir:
+            path = os.path.join(
+                cache_dir, f"json-{size_kb}kb-shape{JSON_SHAPE_VERSION}-seed{variant_seed}.json"
+            )
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    payloads.append(f.read())
+                continue
+        payload = generate_random_json(size_kb, variant_seed)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        payloads.append(payload)
+    return payloads
 
 
 def main(
@@ -75,14 +121,42 @@ def main(
     vpn: str,
     username: str,
     password: str,
+    rate: float = 0,
+    arrivals: str = "fixed",
+    stats_interval: float = DEFAULT_STATS_INTERVAL,
+    debug: bool = False,
+    payload_variants: int = 1,
+    seed: int = 0,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    back_pressure: str = "reject",
+    buffer: int = DEFAULT_PUBLISH_BUFFER,
+    adaptive: bool = False,
+    latency: bool = False,
+    latency_clock: str = "monotonic",
+    duration: float = 0,
+    soak_file: str = None,
+    soak_interval: float = 30.0,
+    profile: bool = False,
 ):
     # Step 1: Log connection parameters
     print(f"Using Solace host: {broker}")
     print(f"Using VPN name: {vpn}")
     print(f"Using username: {username}")
-    print(
-        f"Publishing {num_messages} messages to topic '{topic_name}' with {delay} sec delay"
-    )
+    volume = f"messages for {duration} seconds (soak)" if duration else f"{num_messages} messages"
+    if adaptive:
+        rate = rate or DEFAULT_ADAPTIVE_START_RATE
+        print(
+            f"Publishing {volume} to topic '{topic_name}', ramping up from {rate} msgs/sec "
+            f"until back-pressure ({back_pressure}, buffer {buffer})"
+        )
+    elif rate:
+        print(
+            f"Publishing {volume} to topic '{topic_name}' at {rate} msgs/sec ({arrivals})"
+        )
+    else:
+        print(
+            f"Publishing {volume} to topic '{topic_name}' with {delay} sec delay"
+        )
 
     # Step 2: Configure connection properties as a dictionary
     properties = {
@@ -110,51 +184,125 @@ def main(
         print("- Verify broker, VPN, username, and password are correct")
         return
 
-    # Step 4: Create and start the direct message publisher
-    publisher = (
-        messaging_service.create_direct_message_publisher_builder()
-        .on_back_pressure_reject(1000)
-        .build()
-    )
+    # Step 4: Create and start the direct message publisher with the chosen back-pressure strategy
+    publisher = with_back_pressure(
+        messaging_service.create_direct_message_publisher_builder(), back_pressure, buffer
+    ).build()
     publisher.start()
-    print("Publisher started")
+    back_pressure_handler = BackPressureHandler(publisher)
+    print(f"Publisher started (back-pressure: {back_pressure})")
 
-    # Step 5: Prepare reusable message builder
-    message_builder = messaging_service.message_builder()
+    # Step 5: Prepare reusable message builder with the fixed properties applied once
+    message_builder = (
+        messaging_service.message_builder()
+        .with_application_message_id("loadtest-json")
+        .with_property("content_type", "application/json")
+        .from_properties(MESSAGE_PROPERTIES)
+    )
+    if latency:
+        publisher_id = new_publisher_id()
+        message_builder = message_builder.from_properties(latency_template_properties(publisher_id, latency_clock))
+        print(f"Stamping send time ({latency_clock} clock) and sequence as publisher {publisher_id}")
 
-    # Step 6: Generate JSON payload once and log its size
-    json_payload = generate_random_json(payload_size_kb)
-    final_size = len(json_payload.encode("utf-8")) / 1024  # Size in KB
-    print(f"Generated JSON payload of ~{final_size:.2f} KB")
+    # Step 6: Generate (or load cached) JSON payloads once, log their size and
+    # build each into a message template; only the sequence number varies per send
+    gen_start = time.time()
+    json_payloads = load_json_payloads(payload_size_kb, payload_variants, seed, cache_dir)
+    payload_bytes = len(json_payloads[0].encode("utf-8"))
+    final_size = payload_bytes / 1024  # Size in KB
+    print(
+        f"Prepared {len(json_payloads)} JSON payload variant(s) of {final_size:.2f} KB "
+        f"in {time.time() - gen_start:.3f} seconds"
+    )
+    messages = MessageTemplates(message_builder, json_payloads)
 
-    # Step 7: Publish volume messages with the same JSON payload
+    # Step 7: Publish volume messages, rotating through the JSON payload variants
+    # With --rate, sends follow an absolute schedule and latency is taken from each
+    # message's intended send time; otherwise sleep a fixed delay after each send.
     topic_obj = Topic.of(topic_name)
+    pacer = RatePacer(rate, arrivals == "poisson") if rate else None
+    adaptive_rate = AdaptiveRate(pacer, rate) if adaptive else None
+    send_latency = LatencyHistogram()
+    profiler = StageProfiler() if profile else None
+    stats = StatsReporter("published", stats_interval).start()
+    soak = None
+    if duration:
+        soak = SoakMonitor(stats, soak_file or default_soak_path("publisher-json"), soak_interval).start()
+        deadline = time.monotonic() + duration
+    # Stamped send times are the pacer's due times, moved onto the latency clock once
+    offset_ns = clock_offset_ns(latency_clock)
     start_time = time.time()
-    for i in range(num_messages):
-        # Build outbound message with JSON content type
-        outbound_message = (
-            message_builder.with_application_message_id(f"loadtest-json-{i}")
-            .with_property("content_type", "application/json")
-            .from_properties(MESSAGE_PROPERTIES)
-            .build(json_payload)
-        )
+    if profiler is not None:
+        profiler.start()
+    for i in itertools.count() if duration else range(num_messages):
+        if soak is not None and time.monotonic() >= deadline:
+            break
+        if pacer is not None:
+            due_ns = pacer.wait()
+        if profiler is not None:
+            profiler.lap("sleep")  # pacer wait, or the previous iteration's --delay
 
-        # Publish to topic and log
-        publisher.publish(outbound_message, topic_obj)
-        print(
-            f"Published message {i + 1}/{num_messages} (ID: loadtest-json-{i}, ~{payload_size_kb} KB)"
-        )
+        # Take the next prebuilt JSON message, stamped with sequence number i + 1
+        outbound_message = messages.next(i + 1)
+        if profiler is not None:
+            profiler.lap("build")
+
+        # Publish to topic, retrying on back-pressure, and count (per-message output only with --debug)
+        if latency:
+            pressured = back_pressure_handler.publish(
+                outbound_message, topic_obj, additional_message_properties=latency_properties(
+                    i + 1, latency_clock, due_ns if pacer is not None else None, offset_ns
+                ),
+            )
+        else:
+            pressured = back_pressure_handler.publish(outbound_message, topic_obj)
+        if profiler is not None:
+            profiler.lap("publish")
+        if adaptive_rate is not None:
+            adaptive_rate.update(pressured)
+        stats.messages += 1
+        stats.bytes += payload_bytes
+        if debug:
+            print(
+                f"Published message {i + 1} (sequence: {i + 1}, ~{payload_size_kb} KB)"
+            )
+        if pacer is not None:
+            send_latency.record(time.monotonic_ns() - due_ns)
+        if profiler is not None:
+            profiler.lap("logging")
 
         # Optional delay to control rate
-        if delay > 0:
+        if pacer is None and delay > 0:
             time.sleep(delay)
 
+    if profiler is not None:
+        profiler.stop()
     end_time = time.time()
+    stats.stop()
     print(
-        f"Published {num_messages} messages of ~{payload_size_kb} KB to topic '{topic_name}' "
+        f"Published {stats.messages} messages of ~{payload_size_kb} KB to topic '{topic_name}' "
         f"in {end_time - start_time:.2f} seconds "
-        f"({num_messages / (end_time - start_time):.2f} msgs/sec)"
+        f"({stats.messages / (end_time - start_time):.2f} msgs/sec)"
     )
+    if pacer is not None:
+        print(
+            f"{'Starting' if adaptive else 'Target'} rate: {rate} msgs/sec ({arrivals}), late sends: {pacer.late_sends}, "
+            f"max schedule lag: {pacer.max_lag_ns / 1e6:.3f} ms"
+        )
+        print(f"Send latency from intended send time: {send_latency.format()}")
+    if adaptive_rate is not None:
+        print(
+            f"Adaptive rate: max sustained {adaptive_rate.best_rate:.1f} msgs/sec without back-pressure, "
+            f"final {adaptive_rate.rate:.1f} msgs/sec after {adaptive_rate.backoffs} back-off(s)"
+        )
+    print(f"Back-pressure: {back_pressure_handler.format()}")
+    if profiler is not None:
+        print("Publish loop profile (build, publish() incl. back-pressure retries, sleep, counting/logging):")
+        for line in profiler.report():
+            print(line)
+    if soak is not None:
+        soak.stop()
+        soak.report()
 
     # Step 8: Clean up
     publisher.terminate()
@@ -188,6 +336,108 @@ if __name__ == "__main__":
         default=DEFAULT_DELAY,
         help="Delay between messages in seconds (default: 0.001)",
     )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=0,
+        help="Soak mode: publish for N seconds instead of --messages, sampling resources to --soak-file",
+    )
+    parser.add_argument(
+        "--soak-file",
+        type=str,
+        default=None,
+        help="CSV time series of throughput, RSS, CPU, GC and threads (default: soak-publisher-json-<time>.csv)",
+    )
+    parser.add_argument(
+        "--soak-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between soak samples (default: 30)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Target rate in msgs/sec on an absolute schedule; overrides --delay (default: off)",
+    )
+    parser.add_argument(
+        "--arrivals",
+        type=str,
+        choices=["fixed", "poisson"],
+        default="fixed",
+        help="Spacing of sends in --rate mode (default: fixed)",
+    )
+    parser.add_argument(
+        "--back-pressure",
+        type=str,
+        choices=BACK_PRESSURE_STRATEGIES,
+        default="reject",
+        help="When the publish buffer is full: reject (and retry once ready), wait (block), "
+        "or elastic (unbounded buffer) (default: reject)",
+    )
+    parser.add_argument(
+        "--buffer",
+        type=int,
+        default=DEFAULT_PUBLISH_BUFFER,
+        help="Publish buffer size in messages for reject/wait (default: 1000)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Ramp the rate up from --rate (default 1000) until back-pressure appears, then hold just below it",
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Stamp each message with send time and sequence user properties for solace_subscriber.py --latency",
+    )
+    parser.add_argument(
+        "--latency-clock",
+        type=str,
+        choices=sorted(LATENCY_CLOCKS),
+        default="monotonic",
+        help="Clock for the send time: monotonic (same host) or wall (synced hosts)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time message build, publish(), sleep and logging per call and report percentiles "
+        "and share of wall time (adds ~6 us per message)",
+    )
+    parser.add_argument(
+        "--payload-variants",
+        type=int,
+        default=1,
+        help="Number of distinct JSON payloads to rotate through (default: 1)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for payload generation; variant n uses seed + n (default: 0)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached generated payloads (default: ~/.cache/solace-loadtest)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always generate payloads and don't write them to the cache",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=DEFAULT_STATS_INTERVAL,
+        help="Seconds between throughput reports (0 to disable, default: 5)",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print a line for every published message",
+    )
     parser.add_argument(
         "--broker",
         type=str,
@@ -213,6 +463,8 @@ if __name__ == "__main__":
         help="Broker password (default: default)",
     )
     args = parser.parse_args()
+    if args.adaptive and args.back_pressure == "elastic":
+        parser.error("--adaptive needs a bounded buffer: use --back-pressure reject or wait")
     main(
         args.size,
         args.messages,
@@ -222,4 +474,20 @@ if __name__ == "__main__":
         args.vpn,
         args.username,
         args.password,
+        args.rate,
+        args.arrivals,
+        args.stats_interval,
+        args.debug,
+        max(1, args.payload_variants),
+        args.seed,
+        None if args.no_cache else args.cache_dir,
+        args.back_pressure,
+        max(1, args.buffer),
+        args.adaptive,
+        args.latency,
+        args.latency_clock,
+        args.duration,
+        args.soak_file,
+        args.soak_interval,
+        args.profile,
     )
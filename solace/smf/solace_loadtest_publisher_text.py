@@ -6,6 +6,20 @@ from solace.messaging.messaging_service import MessagingService
 from solace.messaging.publisher.direct_message_publisher import DirectMessagePublisher
 from solace.messaging.resources.topic import Topic
 
+from smf_metrics import (
+    AdaptiveRate,
+    BackPressureHandler,
+    LatencyHistogram,
+    MessageTemplates,
+    RatePacer,
+    StageProfiler,
+    clock_offset_ns,
+    latency_properties,
+    latency_template_properties,
+    new_publisher_id,
+    with_back_pressure,
+)
+
 # Configuration - Set these via env vars or edit directly
 BROKER_HOST = os.environ.get("SOLACE_HOST", "tcp://localhost:55555")
 VPN_NAME = os.environ.get("SOLACE_VPN", "default")
@@ -19,6 +33,14 @@ MESSAGE_BODY = "Load test message payload"  # Can be str or bytes for SMF binary
 DELAY_BETWEEN_MSGS = (
     0.001  # Seconds between messages (0 for max speed; adjust to avoid backpressure)
 )
+TARGET_RATE = 0  # Msgs/sec on an absolute schedule (0 to pace with DELAY_BETWEEN_MSGS instead)
+POISSON_ARRIVALS = False  # With TARGET_RATE, use exponential gaps between sends instead of fixed ones
+BACK_PRESSURE = "reject"  # "reject" (retry once ready), "wait" (block) or "elastic" (unbounded buffer)
+PUBLISH_BUFFER = 1000  # Messages buffered before back-pressure applies (reject/wait)
+ADAPTIVE_RATE = False  # Ramp up from TARGET_RATE (or 1000) until back-pressure, then hold just below it
+STAMP_LATENCY = False  # Add send time and sequence user properties for solace_subscriber.py --latency
+LATENCY_CLOCK = "monotonic"  # "monotonic" (subscriber on the same host) or "wall" (clock-synced hosts)
+PROFILE_LOOP = False  # Time build, publish(), sleep and logging per message (adds ~6 us per message)
 MESSAGE_PROPERTIES = {"app_id": "loadtest"}  # Optional custom SMF properties
 
 
@@ -40,40 +62,95 @@ def main():
         return
 
     # Step 3: Create and start the direct message publisher
-    # Configures backpressure to reject if buffer hits 1000 (prevents overload)
-    publisher: DirectMessagePublisher = (
-        messaging_service.create_direct_message_publisher_builder()
-        .on_back_pressure_reject(1000)
-        .build()
-    )
+    # Configures backpressure per BACK_PRESSURE once the buffer hits PUBLISH_BUFFER (prevents overload)
+    publisher: DirectMessagePublisher = with_back_pressure(
+        messaging_service.create_direct_message_publisher_builder(), BACK_PRESSURE, PUBLISH_BUFFER
+    ).build()
     publisher.start()
-    print("Publisher started")
+    back_pressure_handler = BackPressureHandler(publisher)
+    print(f"Publisher started (back-pressure: {BACK_PRESSURE})")
 
-    # Step 4: Prepare reusable message builder for efficiency
-    message_builder = messaging_service.message_builder()
+    # Step 4: Build the message once (supports SMF properties and binary payloads);
+    # each send reuses it and only sets its sequence number
+    message_builder = (
+        messaging_service.message_builder()
+        .with_application_message_id("loadtest-msg")
+        .from_properties(MESSAGE_PROPERTIES)
+    )
+    if STAMP_LATENCY:
+        message_builder = message_builder.from_properties(
+            latency_template_properties(new_publisher_id(), LATENCY_CLOCK)
+        )
+    messages = MessageTemplates(message_builder, [MESSAGE_BODY])
 
     # Step 5: Publish volume messages
     topic_obj = Topic.of(TOPIC)
+    rate = TARGET_RATE or (1000 if ADAPTIVE_RATE else 0)
+    pacer = RatePacer(rate, POISSON_ARRIVALS) if rate else None
+    adaptive_rate = AdaptiveRate(pacer, rate) if ADAPTIVE_RATE else None
+    send_latency = LatencyHistogram()  # intended send time -> publish() returned
+    profiler = StageProfiler() if PROFILE_LOOP else None
+    # Stamped send times are the pacer's due times, moved onto the latency clock once
+    offset_ns = clock_offset_ns(LATENCY_CLOCK)
     start_time = time.time()
+    if profiler is not None:
+        profiler.start()
     for i in range(VOLUME):
-        # Build outbound message (supports SMF properties and binary payloads)
-        outbound_message = (
-            message_builder.with_application_message_id(f"loadtest-msg-{i}")
-            .from_properties(MESSAGE_PROPERTIES)
-            .build(MESSAGE_BODY)
-        )
+        if pacer is not None:
+            due_ns = pacer.wait()
+        if profiler is not None:
+            profiler.lap("sleep")  # pacer wait, or the previous iteration's delay
+
+        # Take the prebuilt message, stamped with sequence number i + 1
+        outbound_message = messages.next(i + 1)
+        if profiler is not None:
+            profiler.lap("build")
 
-        # Publish to topic (or queue-bound topic)
-        publisher.publish(outbound_message, topic_obj)
+        # Publish to topic (or queue-bound topic), riding out back-pressure
+        if STAMP_LATENCY:
+            pressured = back_pressure_handler.publish(
+                outbound_message, topic_obj, additional_message_properties=latency_properties(
+                    i + 1, LATENCY_CLOCK, due_ns if pacer is not None else None, offset_ns
+                ),
+            )
+        else:
+            pressured = back_pressure_handler.publish(outbound_message, topic_obj)
+        if profiler is not None:
+            profiler.lap("publish")
+        if adaptive_rate is not None:
+            adaptive_rate.update(pressured)
+        if pacer is not None:
+            send_latency.record(time.monotonic_ns() - due_ns)
+        if profiler is not None:
+            profiler.lap("logging")
 
         # Optional delay to control rate (remove for burst publishing)
-        time.sleep(DELAY_BETWEEN_MSGS)
+        if pacer is None:
+            time.sleep(DELAY_BETWEEN_MSGS)
 
     end_time = time.time()
+    if profiler is not None:
+        profiler.stop()
     print(
         f"Published {VOLUME} messages to topic '{TOPIC}' in {end_time - start_time:.2f} seconds "
         f"({VOLUME / (end_time - start_time):.2f} msgs/sec)"
     )
+    if pacer is not None:
+        print(
+            f"Target rate: {rate} msgs/sec, late sends: {pacer.late_sends}, "
+            f"max schedule lag: {pacer.max_lag_ns / 1e6:.3f} ms"
+        )
+        print(f"Send latency from intended send time: {send_latency.format()}")
+    if adaptive_rate is not None:
+        print(
+            f"Adaptive rate: max sustained {adaptive_rate.best_rate:.1f} msgs/sec without back-pressure, "
+            f"final {adaptive_rate.rate:.1f} msgs/sec after {adaptive_rate.backoffs} back-off(s)"
+        )
+    print(f"Back-pressure: {back_pressure_handler.format()}")
+    if profiler is not None:
+        print("Publish loop profile (build, publish() incl. back-pressure retries, sleep, bookkeeping):")
+        for line in profiler.report():
+            print(line)
 
     # Step 6: Clean up
     publisher.terminate()
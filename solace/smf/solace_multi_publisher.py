@@ -0,0 +1,370 @@
+"""Multi-connection, multi-threaded Solace direct load test publisher.
+
+Opens --connections MessagingService sessions, each with its own direct publisher
+shared by --threads-per-connection publishing threads, optionally spread over
+--processes worker processes to get past the GIL. --messages (and --rate) are
+totals split evenly across all threads; every worker's counters are merged into
+one report at the end.
+
+Examples:
+    python solace_multi_publisher.py --size 1 --messages 1000000 --connections 4 --threads-per-connection 2
+    python solace_multi_publisher.py --size 10 --messages 1000000 --connections 8 --processes 4
+    python solace_multi_publisher.py --size 1 --messages 600000 --connections 4 --rate 10000
+"""
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+
+from solace.messaging.messaging_service import MessagingService
+from solace.messaging.resources.topic import Topic
+
+from smf_metrics import (
+    BACK_PRESSURE_STRATEGIES,
+    DEFAULT_PUBLISH_BUFFER,
+    BackPressureHandler,
+    LatencyHistogram,
+    MessageTemplates,
+    RatePacer,
+    StatsReporter,
+    with_back_pressure,
+)
+from solace_loadtest_publisher_json import DEFAULT_CACHE_DIR, MESSAGE_PROPERTIES, load_json_payloads
+
+# Default configuration
+DEFAULT_BROKER = "tcp://localhost:55555"
+DEFAULT_VPN = "default"
+DEFAULT_USERNAME = "default"
+DEFAULT_PASSWORD = "default"
+
+# Default load test config
+DEFAULT_TOPIC = "solace/loadtest/topic"
+DEFAULT_VOLUME = 100000
+DEFAULT_CONNECTIONS = 2
+DEFAULT_THREADS_PER_CONNECTION = 1
+DEFAULT_STATS_INTERVAL = 5.0
+
+
+class WorkerStats:
+    """Counters for all connections and threads in one worker process."""
+
+    def __init__(self):
+        self.connected = 0
+        self.connect_failures = 0
+        self.published = 0
+        self.errors = 0
+        self.bytes = 0
+        self.first_send = None
+        self.last_send = None
+        self.late_sends = 0
+        self.rejects = 0
+        self.blocked_sends = 0
+        self.blocked_ns = 0
+        self.send_latency = LatencyHistogram()
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+def publish_thread(
+    args, messaging_service, back_pressure_handler, payloads, payload_bytes, name, count, counters, stats, lock
+):
+    """Publishes `count` messages through a connection's shared publisher; counts only into `counters`."""
+    message_builder = (
+        messaging_service.message_builder()
+        .with_application_message_id(f"loadtest-{name}")
+        .with_property("content_type", "application/json")
+        .from_properties(MESSAGE_PROPERTIES)
+    )
+    # Each thread sets sequence numbers on its own templates
+    messages = MessageTemplates(message_builder, payloads)
+    topic_obj = Topic.of(args.topic)
+    pacer = RatePacer(args.rate / args.total_threads, args.arrivals == "poisson") if args.rate else None
+    send_latency = LatencyHistogram()
+    first_send = None
+    for i in range(count):
+        if pacer is not None:
+            due_ns = pacer.wait()
+        outbound_message = messages.next(i + 1)
+        if first_send is None:
+            first_send = time.time()
+        try:
+            back_pressure_handler.publish(outbound_message, topic_obj)
+        except Exception:
+            counters.errors += 1
+            continue
+        counters.messages += 1
+        counters.bytes += payload_bytes
+        if pacer is not None:
+            send_latency.record(time.monotonic_ns() - due_ns)
+    last_send = time.time()
+
+    # Fold into the worker totals once, at the end
+    with lock:
+        if first_send is not None and (stats.first_send is None or first_send < stats.first_send):
+            stats.first_send = first_send
+        stats.last_send = max(stats.last_send or 0, last_send)
+        stats.send_latency.merge(send_latency)
+        if pacer is not None:
+            stats.late_sends += pacer.late_sends
+
+
+def connect(args, properties):
+    messaging_service = MessagingService.builder().from_properties(properties).build()
+    messaging_service.connect()
+    publisher = with_back_pressure(
+        messaging_service.create_direct_message_publisher_builder(), args.back_pressure, args.buffer
+    ).build()
+    publisher.start()
+    return messaging_service, publisher, BackPressureHandler(publisher)
+
+
+def worker_main(worker_args):
+    args, worker, connection_ids = worker_args
+    stats = WorkerStats()
+    lock = threading.Lock()
+    properties = {
+        "solace.messaging.transport.host": args.broker,
+        "solace.messaging.service.vpn-name": args.vpn,
+        "solace.messaging.authentication.scheme.basic.username": args.username,
+        "solace.messaging.authentication.scheme.basic.password": args.password,
+    }
+    payloads = load_json_payloads(args.size, args.payload_variants, args.seed, args.cache_dir)
+    payload_bytes = len(payloads[0].encode("utf-8"))
+
+    sessions = []
+    for connection_id in connection_ids:
+        try:
+            sessions.append((connection_id, *connect(args, properties)))
+            stats.connected += 1
+        except Exception as e:
+            stats.connect_failures += 1
+            print(f"Connection {connection_id} failed: {type(e).__name__}: {e}")
+
+    # Each thread counts into its own reporter-shaped object: one writer per counter
+    threads = []
+    counters = []
+    for connection_id, messaging_service, publisher, back_pressure_handler in sessions:
+        for t in range(args.threads_per_connection):
+            thread_index = connection_id * args.threads_per_connection + t
+            count = args.messages // args.total_threads + (thread_index < args.messages % args.total_threads)
+            thread_counters = StatsReporter(f"c{connection_id}t{t}", 0)
+            counters.append(thread_counters)
+            threads.append(
+                threading.Thread(
+                    target=publish_thread,
+                    args=(
+                        args, messaging_service, back_pressure_handler, payloads, payload_bytes,
+                        f"c{connection_id}t{t}", count, thread_counters, stats, lock,
+                    ),
+                    name=f"publisher-c{connection_id}t{t}",
+                )
+            )
+
+    reporter = StatsReporter(f"worker {worker} published", args.stats_interval, counters).start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reporter.stop()
+    stats.published, stats.bytes, stats.errors = reporter.totals()
+
+    for _, messaging_service, publisher, back_pressure_handler in sessions:
+        stats.rejects += back_pressure_handler.rejects
+        stats.blocked_sends += back_pressure_handler.blocked_sends
+        stats.blocked_ns += back_pressure_handler.blocked_ns
+        publisher.terminate()
+        messaging_service.disconnect()
+    return stats.as_dict()
+
+
+def merge_stats(results):
+    totals = WorkerStats().as_dict()
+    for result in results:
+        for key in (
+            "connected", "connect_failures", "published", "errors", "bytes",
+            "late_sends", "rejects", "blocked_sends", "blocked_ns",
+        ):
+            totals[key] += result[key]
+        totals["send_latency"].merge(result["send_latency"])
+        if result["first_send"] is not None:
+            if totals["first_send"] is None or result["first_send"] < totals["first_send"]:
+                totals["first_send"] = result["first_send"]
+        if result["last_send"] is not None:
+            if totals["last_send"] is None or result["last_send"] > totals["last_send"]:
+                totals["last_send"] = result["last_send"]
+    return totals
+
+
+def main(args):
+    print(f"Using Solace host: {args.broker}")
+    print(f"Using VPN name: {args.vpn}")
+    print(f"Using username: {args.username}")
+    print(
+        f"Publishing {args.messages} messages of {args.size} KB to topic '{args.topic}' over "
+        f"{args.connections} connection(s) x {args.threads_per_connection} thread(s) "
+        f"in {args.processes} process(es)" + (f" at {args.rate} msgs/sec ({args.arrivals})" if args.rate else "")
+    )
+
+    connection_ids = list(range(args.connections))
+    shards = [connection_ids[w :: args.processes] for w in range(args.processes)]
+    shards = [shard for shard in shards if shard]
+    worker_args = [(args, worker, shard) for worker, shard in enumerate(shards, start=1)]
+
+    # Generate (or load cached) payloads once up front so workers start together
+    load_json_payloads(args.size, args.payload_variants, args.seed, args.cache_dir)
+
+    start_time = time.time()
+    if len(shards) == 1:
+        results = [worker_main(worker_args[0])]
+    else:
+        with multiprocessing.Pool(len(shards)) as pool:
+            results = pool.map(worker_main, worker_args)
+    end_time = time.time()
+
+    totals = merge_stats(results)
+    send_window = (totals["last_send"] or end_time) - (totals["first_send"] or start_time)
+    send_window = max(send_window, 1e-9)
+
+    print(
+        f"Connections: {totals['connected']}/{args.connections} (failures: {totals['connect_failures']})"
+    )
+    print(f"Messages published: {totals['published']} (errors: {totals['errors']})")
+    print(f"Total run time: {end_time - start_time:.2f} seconds (incl. connect/disconnect)")
+    print(
+        f"Throughput: {totals['published'] / send_window:.2f} msgs/sec, "
+        f"{totals['bytes'] / send_window / (1024 * 1024):.2f} MB/sec "
+        f"over {send_window:.2f} seconds from first to last send"
+    )
+    print(
+        f"Back-pressure ({args.back_pressure}): rejects={totals['rejects']} "
+        f"blocked sends={totals['blocked_sends']} time blocked={totals['blocked_ns'] / 1e9:.3f} s (summed over threads)"
+    )
+    if args.rate:
+        print(f"Target rate: {args.rate} msgs/sec ({args.arrivals}), late sends: {totals['late_sends']}")
+        print(f"Send latency from intended send time: {totals['send_latency'].format()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solace Multi-Connection Load Test Publisher")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=1,
+        help="Payload size in KB (e.g., 1, 10, 100, 1000)",
+    )
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=DEFAULT_VOLUME,
+        help="Total number of messages to publish across all threads (default: 100000)",
+    )
+    parser.add_argument(
+        "--topic",
+        type=str,
+        default=DEFAULT_TOPIC,
+        help="Topic name to publish to (default: solace/loadtest/topic)",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=DEFAULT_CONNECTIONS,
+        help="Number of broker connections, each with its own publisher (default: 2)",
+    )
+    parser.add_argument(
+        "--threads-per-connection",
+        type=int,
+        default=DEFAULT_THREADS_PER_CONNECTION,
+        help="Publishing threads sharing each connection's publisher (default: 1)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Worker processes to spread connections over (default: 1)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Total target rate in msgs/sec on an absolute schedule, split across threads (default: off)",
+    )
+    parser.add_argument(
+        "--arrivals",
+        type=str,
+        choices=["fixed", "poisson"],
+        default="fixed",
+        help="Spacing of sends in --rate mode (default: fixed)",
+    )
+    parser.add_argument(
+        "--back-pressure",
+        type=str,
+        choices=BACK_PRESSURE_STRATEGIES,
+        default="reject",
+        help="When a publish buffer is full: reject (and retry once ready), wait (block), "
+        "or elastic (unbounded buffer) (default: reject)",
+    )
+    parser.add_argument(
+        "--buffer",
+        type=int,
+        default=DEFAULT_PUBLISH_BUFFER,
+        help="Publish buffer size in messages per connection for reject/wait (default: 1000)",
+    )
+    parser.add_argument(
+        "--payload-variants",
+        type=int,
+        default=1,
+        help="Number of distinct JSON payloads to rotate through (default: 1)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for payload generation; variant n uses seed + n (default: 0)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached generated payloads (default: ~/.cache/solace-loadtest)",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=DEFAULT_STATS_INTERVAL,
+        help="Seconds between per-process throughput reports (0 to disable, default: 5)",
+    )
+    parser.add_argument(
+        "--broker",
+        type=str,
+        default=os.environ.get("SOLACE_HOST", DEFAULT_BROKER),
+        help="Broker host and port (e.g., tcp://<host>:55555)",
+    )
+    parser.add_argument(
+        "--vpn",
+        type=str,
+        default=os.environ.get("SOLACE_VPN", DEFAULT_VPN),
+        help="Message VPN name (default: default)",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        default=os.environ.get("SOLACE_USERNAME", DEFAULT_USERNAME),
+        help="Broker username (default: default)",
+    )
+    parser.add_argument(
+        "--password",
+        type=str,
+        default=os.environ.get("SOLACE_PASSWORD", DEFAULT_PASSWORD),
+        help="Broker password (default: default)",
+    )
+    args = parser.parse_args()
+    args.connections = max(1, args.connections)
+    args.threads_per_connection = max(1, args.threads_per_connection)
+    args.processes = max(1, min(args.processes, args.connections))
+    args.payload_variants = max(1, args.payload_variants)
+    args.buffer = max(1, args.buffer)
+    args.total_threads = args.connections * args.threads_per_connection
+    main(args)
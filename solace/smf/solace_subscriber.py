@@ -1,5 +1,9 @@
 import argparse
+import json
+import multiprocessing
 import os
+import queue
+import threading
 import time
 
 from solace.messaging.messaging_service import MessagingService
@@ -7,6 +11,8 @@ from solace.messaging.receiver.message_receiver import InboundMessage, MessageHa
 from solace.messaging.resources.queue import Queue
 from solace.messaging.resources.topic_subscription import TopicSubscription
 
+from smf_metrics import LatencyHistogram, LatencyRecorder, SoakMonitor, StatsReporter, default_soak_path
+
 # Default configuration
 DEFAULT_BROKER = "tcp://localhost:55555"
 DEFAULT_VPN = "default"
@@ -14,10 +20,142 @@ DEFAULT_USERNAME = "default"
 DEFAULT_PASSWORD = "default"
 DEFAULT_TOPIC = "solace/loadtest/topic"
 DEFAULT_QUEUE = None  # Set to queue name for queue consumption
+DEFAULT_STATS_INTERVAL = 5.0
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_RUN_TIME = 3600  # seconds to run without --duration
+
+# Per-message processing that can run off the dispatch thread (--process)
+PROCESSORS = {
+    "none": None,
+    "decode": lambda payload: payload.decode("utf-8"),
+    "json": json.loads,
+}
+
+
+def process_payloads(work, results, process):
+    """Worker loop (thread or process): run PROCESSORS[process] on payloads until a None arrives."""
+    processor = PROCESSORS[process]
+    handler_time = LatencyHistogram()
+    processed = 0
+    errors = 0
+    while True:
+        payload = work.get()
+        if payload is None:
+            break
+        start = time.monotonic_ns()
+        try:
+            processor(payload)
+        except Exception:
+            errors += 1
+        handler_time.record(time.monotonic_ns() - start)
+        processed += 1
+    results.put((processed, errors, handler_time))
+
+
+class WorkerPool:
+    """Bounded queue feeding payloads to `workers` threads or processes.
+
+    submit() blocks the dispatch thread while the queue is full, so a consumer that
+    can't keep up shows as queue depth and enqueue wait time rather than memory
+    growth. Each worker keeps its own handler-time histogram; stop() merges them.
+    """
+
+    def __init__(self, workers: int, mode: str, queue_size: int, process: str):
+        if mode == "process":
+            self.work = multiprocessing.Queue(queue_size)
+            self.results = multiprocessing.Queue()
+            spawn = multiprocessing.Process
+        else:
+            self.work = queue.Queue(queue_size)
+            self.results = queue.Queue()
+            spawn = threading.Thread
+        self.workers = [
+            spawn(target=process_payloads, args=(self.work, self.results, process), daemon=True)
+            for _ in range(workers)
+        ]
+        self.max_depth = 0
+        self.enqueue_waits = 0
+        self.enqueue_wait_ns = 0
+        self.processed = 0
+        self.errors = 0
+        self.handler_time = LatencyHistogram()
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        return self
+
+    def depth(self) -> int:
+        try:
+            return self.work.qsize()
+        except NotImplementedError:  # multiprocessing.Queue on macOS
+            return -1
+
+    def submit(self, payload: bytes):
+        try:
+            self.work.put_nowait(payload)
+        except queue.Full:
+            start = time.monotonic_ns()
+            self.work.put(payload)
+            self.enqueue_waits += 1
+            self.enqueue_wait_ns += time.monotonic_ns() - start
+        self.max_depth = max(self.max_depth, self.depth())
+
+    def stop(self):
+        for _ in self.workers:
+            self.work.put(None)
+        for _ in self.workers:
+            processed, errors, handler_time = self.results.get()
+            self.processed += processed
+            self.errors += errors
+            self.handler_time.merge(handler_time)
+        for worker in self.workers:
+            worker.join()
+
+    def format(self):
+        return (
+            f"queue depth {self.depth()} (max {self.max_depth}), "
+            f"{self.enqueue_waits} enqueue waits ({self.enqueue_wait_ns / 1e9:.3f} s blocked)"
+        )
 
 
 class SimpleMessageHandler(MessageHandler):
+    def __init__(
+        self,
+        stats: StatsReporter,
+        debug: bool = False,
+        pool: WorkerPool = None,
+        process: str = "none",
+        latency: LatencyRecorder = None,
+    ):
+        self.stats = stats
+        self.latency = latency
+        self.debug = debug
+        self.pool = pool
+        self.processor = PROCESSORS[process]
+        self.handler_time = LatencyHistogram()  # time spent in on_message on the dispatch thread
+
     def on_message(self, message: InboundMessage):
+        # Runs on the API dispatch thread: read the payload as bytes for its length and
+        # counters only; heavier work goes to the pool (or runs inline without one)
+        start = time.monotonic_ns()
+        payload_bytes = message.get_payload_as_bytes() or b""
+        self.stats.messages += 1
+        self.stats.bytes += len(payload_bytes)
+        if self.latency is not None:
+            self.latency.record(message)
+        if self.processor is not None and self.pool is not None:
+            self.pool.submit(payload_bytes)
+        elif self.processor is not None:
+            try:
+                self.processor(payload_bytes)
+            except Exception:
+                self.stats.errors += 1
+        if self.debug:
+            self.print_message(message)
+        self.handler_time.record(time.monotonic_ns() - start)
+
+    def print_message(self, message: InboundMessage):
         message_id = message.get_application_message_id() or "N/A"
         payload = message.get_payload_as_string() or "N/A"
         payload_size = len(payload.encode("utf-8")) / 1024  # Size in KB
@@ -28,7 +166,24 @@ class SimpleMessageHandler(MessageHandler):
         )
 
 
-def main(broker: str, vpn: str, username: str, password: str, topic: str, queue: str):
+def main(
+    broker: str,
+    vpn: str,
+    username: str,
+    password: str,
+    topic: str,
+    queue: str,
+    stats_interval: float = DEFAULT_STATS_INTERVAL,
+    debug: bool = False,
+    workers: int = 0,
+    worker_mode: str = "thread",
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    process: str = "none",
+    latency: bool = False,
+    duration: float = 0,
+    soak_file: str = None,
+    soak_interval: float = 30.0,
+):
     # Log connection parameters
     print(f"Using Solace host: {broker}")
     print(f"Using VPN name: {vpn}")
@@ -47,6 +202,13 @@ def main(broker: str, vpn: str, username: str, password: str, topic: str, queue:
     # Build and connect messaging service
     messaging_service = MessagingService.builder().from_properties(properties).build()
     receiver = None
+    # Without a processor there is nothing for a pool to do: count on the dispatch thread
+    pool = None
+    if workers and PROCESSORS[process] is not None:
+        pool = WorkerPool(workers, worker_mode, queue_size, process).start()
+    stats = StatsReporter("received", stats_interval, extra=pool.format if pool is not None else None)
+    handler = SimpleMessageHandler(stats, debug, pool, process, LatencyRecorder() if latency else None)
+    soak = None
     try:
         messaging_service.connect()
         print(f"Connected to Solace broker at {broker}")
@@ -70,12 +232,15 @@ def main(broker: str, vpn: str, username: str, password: str, topic: str, queue:
         # Start receiver and attach handler
         receiver.start()
         print(f"Receiver started for {'queue ' + queue if queue else 'topic ' + topic}")
-        receiver.receive_async(SimpleMessageHandler())
+        stats.start()
+        if duration:
+            soak = SoakMonitor(stats, soak_file or default_soak_path("subscriber"), soak_interval).start()
+        receiver.receive_async(handler)
 
-        # Keep running until interrupted
+        # Keep running for --duration (soak) or an hour, or until interrupted
         print("Running. Press Ctrl+C to stop.")
         try:
-            time.sleep(3600)  # Run for 1 hour or until interrupted
+            time.sleep(duration or DEFAULT_RUN_TIME)
         except KeyboardInterrupt:
             print("Stopping receiver...")
     except Exception as e:
@@ -90,6 +255,22 @@ def main(broker: str, vpn: str, username: str, password: str, topic: str, queue:
         # Clean up
         if receiver:
             receiver.terminate()
+        stats.stop()
+        print(f"Received {stats.messages} messages ({stats.bytes / 1024:.2f} KB)")
+        print(f"Dispatch handler time: {handler.handler_time.format(1e3, 'us')}")
+        if handler.latency is not None:
+            print(f"End-to-end latency: {handler.latency.latency.format()}")
+            print(f"Sequence: {handler.latency.sequences.format()} unstamped={handler.latency.unstamped}")
+        if pool is not None:
+            pool.stop()
+            print(
+                f"Worker pool ({workers} {worker_mode}(s), --process {process}): processed {pool.processed}, "
+                f"{pool.errors} errors, {pool.format()}"
+            )
+            print(f"Worker handler time: {pool.handler_time.format(1e3, 'us')}")
+        if soak is not None:
+            soak.stop()
+            soak.report()
         messaging_service.disconnect()
         print("Disconnected")
 
@@ -132,5 +313,84 @@ if __name__ == "__main__":
         default=DEFAULT_QUEUE,
         help="Queue name to consume from (default: None, uses topic if not set)",
     )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=DEFAULT_STATS_INTERVAL,
+        help="Seconds between throughput reports (0 to disable, default: 5)",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print every received message (ID, size and payload snippet)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=0,
+        help="Soak mode: run for N seconds, sampling resources to --soak-file (default: run 1 hour, no sampling)",
+    )
+    parser.add_argument(
+        "--soak-file",
+        type=str,
+        default=None,
+        help="CSV time series of throughput, RSS, CPU, GC and threads (default: soak-subscriber-<time>.csv)",
+    )
+    parser.add_argument(
+        "--soak-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between soak samples (default: 30)",
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Record latency and gaps/duplicates from publisher --latency user properties",
+    )
+    parser.add_argument(
+        "--process",
+        type=str,
+        choices=sorted(PROCESSORS),
+        default="none",
+        help="Per-message processing: decode to text or parse JSON (default: none, count only)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Run --process on this many pool workers instead of the dispatch thread (default: 0)",
+    )
+    parser.add_argument(
+        "--worker-mode",
+        type=str,
+        choices=["thread", "process"],
+        default="thread",
+        help="Pool of threads, or processes to get past the GIL (default: thread)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="Max payloads waiting for a pool worker; the dispatch thread blocks when full (default: 10000)",
+    )
     args = parser.parse_args()
-    main(args.broker, args.vpn, args.username, args.password, args.topic, args.queue)
+    if args.workers > 0 and args.process == "none":
+        parser.error("--workers needs --process decode or json: with --process none there is no work to offload")
+    main(
+        args.broker,
+        args.vpn,
+        args.username,
+        args.password,
+        args.topic,
+        args.queue,
+        args.stats_interval,
+        args.debug,
+        max(0, args.workers),
+        args.worker_mode,
+        max(1, args.queue_size),
+        args.process,
+        args.latency,
+        args.duration,
+        args.soak_file,
+        args.soak_interval,
+    )
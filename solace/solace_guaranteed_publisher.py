@@ -0,0 +1,391 @@
+"""Windowed guaranteed (persistent) message load test publisher.
+
+Publishes asynchronously with up to --window messages awaiting a broker receipt,
+tracks receipts through a publish-receipt listener, and reports receipt latency
+percentiles, acked/nacked counts and sustained spool throughput.
+
+Topic must be mapped to a queue (or the broker must otherwise spool it) for the
+broker to acknowledge persistent messages.
+
+Examples:
+    python solace_guaranteed_publisher.py --size 1 --messages 10000 --window 100
+    python solace_guaranteed_publisher.py --size 100 --messages 5000 --topic my/test/topic --window 255 --delay 0
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from solace.messaging.messaging_service import MessagingService
+from solace.messaging.publisher.persistent_message_publisher import (
+    MessagePublishReceiptListener,
+    PublishReceipt,
+)
+from solace.messaging.resources.topic import Topic
+
+# Share the payload generator and histogram with the SMF load test scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "smf"))
+from smf_metrics import (  # noqa: E402
+    LATENCY_CLOCKS,
+    LatencyHistogram,
+    RatePacer,
+    StatsReporter,
+    clock_offset_ns,
+    latency_properties,
+    latency_template_properties,
+    new_publisher_id,
+)
+from solace_loadtest_publisher_json import DEFAULT_CACHE_DIR, load_json_payloads  # noqa: E402
+
+# Default configuration
+DEFAULT_BROKER = "tcp://localhost:55555"
+DEFAULT_VPN = "default"
+DEFAULT_USERNAME = "default"
+DEFAULT_PASSWORD = "default"
+
+# Default load test config
+DEFAULT_TOPIC = "solace/loadtest/topic"
+DEFAULT_VOLUME = 1000
+DEFAULT_DELAY = 0.0
+DEFAULT_WINDOW = 50
+DEFAULT_STATS_INTERVAL = 5.0
+DEFAULT_DRAIN_TIMEOUT = 30.0
+MESSAGE_PROPERTIES = {"app_id": "loadtest"}  # Optional custom SMF properties
+
+
+class ReceiptTracker(MessagePublishReceiptListener):
+    """Frees a window slot and records latency for each publish receipt.
+
+    The user context of every publish is its send time from time.monotonic_ns()
+    (the intended send time with --rate), so receipt latency needs no lookup
+    table. Runs on the API's callback thread.
+    """
+
+    def __init__(self, window: int, stats: StatsReporter):
+        self.slots = threading.Semaphore(window)
+        self.window = window
+        self.stats = stats
+        self.latency = LatencyHistogram()
+        self.acked = 0
+        self.nacked = 0
+        self.last_receipt_ns = None
+        self.lock = threading.Lock()
+        self.drained = threading.Condition(self.lock)
+        self.outstanding = 0
+
+    def sent(self):
+        with self.lock:
+            self.outstanding += 1
+
+    def on_publish_receipt(self, publish_receipt: PublishReceipt):
+        now = time.monotonic_ns()
+        send_ns = publish_receipt.user_context
+        # Also called from the publishing thread for rejected publishes, so count under the lock
+        with self.lock:
+            if publish_receipt.exception is None and publish_receipt.is_persisted:
+                self.acked += 1
+                self.stats.messages += 1
+            else:
+                self.nacked += 1
+                self.stats.errors += 1
+            if send_ns is not None:
+                self.latency.record(now - send_ns)
+            self.last_receipt_ns = now
+            self.outstanding -= 1
+            if self.outstanding == 0:
+                self.drained.notify_all()
+        self.slots.release()
+
+    def wait_drained(self, timeout: float) -> bool:
+        with self.lock:
+            return self.drained.wait_for(lambda: self.outstanding == 0, timeout)
+
+
+def main(
+    payload_size_kb: int,
+    num_messages: int,
+    topic_name: str,
+    delay: float,
+    broker: str,
+    vpn: str,
+    username: str,
+    password: str,
+    window: int = DEFAULT_WINDOW,
+    rate: float = 0,
+    arrivals: str = "fixed",
+    stats_interval: float = DEFAULT_STATS_INTERVAL,
+    debug: bool = False,
+    payload_variants: int = 1,
+    seed: int = 0,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    latency: bool = False,
+    latency_clock: str = "monotonic",
+):
+    # Step 1: Log connection parameters
+    print(f"Using Solace host: {broker}")
+    print(f"Using VPN name: {vpn}")
+    print(f"Using username: {username}")
+    print(
+        f"Publishing {num_messages} guaranteed messages to topic '{topic_name}' "
+        f"with up to {window} awaiting receipt and {delay} sec delay"
+    )
+
+    # Step 2: Configure connection properties as a dictionary
+    properties = {
+        "solace.messaging.transport.host": broker,
+        "solace.messaging.service.vpn-name": vpn,
+        "solace.messaging.authentication.scheme.basic.username": username,
+        "solace.messaging.authentication.scheme.basic.password": password,
+    }
+
+    # Step 3: Build and connect the messaging service
+    messaging_service = MessagingService.builder().from_properties(properties).build()
+    try:
+        messaging_service.connect()
+        print(f"Connected to Solace broker at {broker}")
+    except Exception as e:
+        print(f"Connection failed: {str(e)}")
+        print(f"Error details: {type(e).__name__}")
+        print("Suggestions:")
+        print("- Verify Solace broker is running and accessible")
+        print("- Ensure port 55555 (or 55443 for TLS) is open")
+        print("- Verify broker, VPN, username, and password are correct")
+        return
+
+    # Step 4: Create and start the persistent publisher with a receipt listener
+    stats = StatsReporter("acked", stats_interval)
+    receipts = ReceiptTracker(window, stats)
+    publisher = messaging_service.create_persistent_message_publisher_builder().build()
+    publisher.set_message_publish_receipt_listener(receipts)
+    publisher.start()
+    print("Persistent publisher started")
+
+    # Step 5: Prepare reusable message builder and payloads
+    message_builder = messaging_service.message_builder()
+    if latency:
+        publisher_id = new_publisher_id()
+        message_builder = message_builder.from_properties(latency_template_properties(publisher_id, latency_clock))
+        print(f"Stamping send time ({latency_clock} clock) and sequence as publisher {publisher_id}")
+    json_payloads = load_json_payloads(payload_size_kb, payload_variants, seed, cache_dir)
+    payload_bytes = len(json_payloads[0].encode("utf-8"))
+    print(f"Prepared {len(json_payloads)} JSON payload variant(s) of {payload_bytes / 1024:.2f} KB")
+
+    # Step 6: Publish asynchronously, blocking only when the window is full.
+    # With --rate, receipt latency is measured from each message's intended send time.
+    topic_obj = Topic.of(topic_name)
+    pacer = RatePacer(rate, arrivals == "poisson") if rate else None
+    stats.start()
+    publish_errors = 0
+    offset_ns = clock_offset_ns(latency_clock)
+    start_ns = time.monotonic_ns()
+    for i in range(num_messages):
+        send_ns = pacer.wait() if pacer is not None else None
+        receipts.slots.acquire()
+        outbound_message = (
+            message_builder.with_application_message_id(f"loadtest-guaranteed-{i}")
+            .with_property("content_type", "application/json")
+            .from_properties(MESSAGE_PROPERTIES)
+            .build(json_payloads[i % len(json_payloads)])
+        )
+        receipts.sent()
+        try:
+            publisher.publish(
+                outbound_message,
+                topic_obj,
+                user_context=send_ns or time.monotonic_ns(),
+                additional_message_properties=(
+                    latency_properties(i + 1, latency_clock, send_ns, offset_ns) if latency else None
+                ),
+            )
+            stats.bytes += payload_bytes
+            if debug:
+                print(f"Published message {i + 1}/{num_messages} (ID: loadtest-guaranteed-{i})")
+        except Exception as e:
+            # No receipt will follow a rejected publish: give the slot back (and count the error) ourselves
+            publish_errors += 1
+            receipts.on_publish_receipt(PublishReceipt(outbound_message, e, 0, False, None))
+            if publish_errors == 1:
+                print(f"Publish failed: {e}")
+        if pacer is None and delay > 0:
+            time.sleep(delay)
+    publish_end_ns = time.monotonic_ns()
+
+    # Step 7: Wait for outstanding receipts, then report
+    if not receipts.wait_drained(drain_timeout):
+        print(f"Timed out after {drain_timeout} seconds waiting for {receipts.outstanding} receipt(s)")
+    stats.stop()
+
+    publish_seconds = (publish_end_ns - start_ns) / 1e9
+    spool_seconds = ((receipts.last_receipt_ns or publish_end_ns) - start_ns) / 1e9
+    print(
+        f"Published {num_messages} messages of {payload_bytes / 1024:.2f} KB to topic '{topic_name}' "
+        f"in {publish_seconds:.2f} seconds ({num_messages / max(publish_seconds, 1e-9):.2f} msgs/sec offered)"
+    )
+    print(
+        f"Receipts: {receipts.acked} acked, {receipts.nacked} nacked "
+        f"({publish_errors} rejected at publish), {receipts.outstanding} outstanding"
+    )
+    print(
+        f"Sustained spool throughput: {receipts.acked / max(spool_seconds, 1e-9):.2f} msgs/sec, "
+        f"{receipts.acked * payload_bytes / max(spool_seconds, 1e-9) / (1024 * 1024):.2f} MB/sec "
+        f"over {spool_seconds:.2f} seconds from first send to last receipt"
+    )
+    if pacer is not None:
+        print(
+            f"Target rate: {rate} msgs/sec ({arrivals}), late sends: {pacer.late_sends}, "
+            f"max schedule lag: {pacer.max_lag_ns / 1e6:.3f} ms"
+        )
+    print(f"Receipt latency: {receipts.latency.format()}")
+
+    # Step 8: Clean up
+    publisher.terminate()
+    messaging_service.disconnect()
+    print("Disconnected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solace Guaranteed Load Test Publisher")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=1,
+        help="Payload size in KB (e.g., 1, 10, 100, 1000)",
+    )
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=DEFAULT_VOLUME,
+        help="Number of messages to publish (default: 1000)",
+    )
+    parser.add_argument(
+        "--topic",
+        type=str,
+        default=DEFAULT_TOPIC,
+        help="Topic name to publish to (default: solace/loadtest/topic)",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=DEFAULT_DELAY,
+        help="Delay between messages in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Target rate in msgs/sec on an absolute schedule; overrides --delay (default: off)",
+    )
+    parser.add_argument(
+        "--arrivals",
+        type=str,
+        choices=["fixed", "poisson"],
+        default="fixed",
+        help="Spacing of sends in --rate mode (default: fixed)",
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Stamp each message with send time and sequence user properties for subscriber --latency",
+    )
+    parser.add_argument(
+        "--latency-clock",
+        type=str,
+        choices=sorted(LATENCY_CLOCKS),
+        default="monotonic",
+        help="Clock for the send time: monotonic (same host) or wall (synced hosts)",
+    )
+    parser.add_argument(
+        "--payload-variants",
+        type=int,
+        default=1,
+        help="Number of distinct JSON payloads to rotate through (default: 1)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for payload generation; variant n uses seed + n (default: 0)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached generated payloads (default: ~/.cache/solace-loadtest)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always generate payloads and don't write them to the cache",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_WINDOW,
+        help="Max messages published but not yet acknowledged by the broker (default: 50)",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=DEFAULT_DRAIN_TIMEOUT,
+        help="Seconds to wait for outstanding receipts at the end (default: 30)",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=DEFAULT_STATS_INTERVAL,
+        help="Seconds between throughput reports (0 to disable, default: 5)",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print a line for every published message",
+    )
+    parser.add_argument(
+        "--broker",
+        type=str,
+        default=os.environ.get("SOLACE_HOST", DEFAULT_BROKER),
+        help="Broker host and port (e.g., tcp://<host>:55555)",
+    )
+    parser.add_argument(
+        "--vpn",
+        type=str,
+        default=os.environ.get("SOLACE_VPN", DEFAULT_VPN),
+        help="Message VPN name (default: default)",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        default=os.environ.get("SOLACE_USERNAME", DEFAULT_USERNAME),
+        help="Broker username (default: default)",
+    )
+    parser.add_argument(
+        "--password",
+        type=str,
+        default=os.environ.get("SOLACE_PASSWORD", DEFAULT_PASSWORD),
+        help="Broker password (default: default)",
+    )
+    args = parser.parse_args()
+    main(
+        args.size,
+        args.messages,
+        args.topic,
+        args.delay,
+        args.broker,
+        args.vpn,
+        args.username,
+        args.password,
+        max(1, args.window),
+        args.rate,
+        args.arrivals,
+        args.stats_interval,
+        args.debug,
+        max(1, args.payload_variants),
+        args.seed,
+        None if args.no_cache else args.cache_dir,
+        args.drain_timeout,
+        args.latency,
+        args.latency_clock,
+    )
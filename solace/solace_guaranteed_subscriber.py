@@ -0,0 +1,359 @@
+"""Guaranteed (persistent) queue consumer for load testing ack strategies.
+
+Messages are delivered asynchronously through receive_async. In client-ack mode
+acknowledgements are deferred off the dispatch path: pending messages are acked
+(one ack() per message; the API has no batched ack) once --ack-batch of them are
+pending or every --ack-interval seconds, whichever comes first. In auto-ack mode
+the API acknowledges each message itself once the handler returns.
+
+Keep --ack-batch below the queue's "max delivered unacked msgs per flow": the
+broker stops delivering when that many messages are outstanding, and a flush
+threshold that is never reached is then only flushed by the interval timer.
+
+Examples:
+    python solace_guaranteed_subscriber.py --queue loadtest-queue
+    python solace_guaranteed_subscriber.py --queue loadtest-queue --ack-mode client --ack-batch 100 --ack-interval 0.05
+    python solace_guaranteed_subscriber.py --queue loadtest-queue --expect 100000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from solace.messaging.messaging_service import MessagingService
+from solace.messaging.receiver.message_receiver import InboundMessage, MessageHandler
+from solace.messaging.resources.queue import Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "smf"))
+from smf_metrics import LatencyRecorder, StatsReporter  # noqa: E402
+
+# Default configuration
+DEFAULT_BROKER = "tcp://localhost:55555"
+DEFAULT_VPN = "default"
+DEFAULT_USERNAME = "default"
+DEFAULT_PASSWORD = "default"
+DEFAULT_QUEUE = "loadtest-queue"
+
+# Default consumer config
+DEFAULT_ACK_MODE = "client"
+DEFAULT_ACK_BATCH = 50
+DEFAULT_ACK_INTERVAL = 0.1
+DEFAULT_DURATION = 3600.0
+DEFAULT_STATS_INTERVAL = 5.0
+
+
+class DeferredAcker:
+    """Defers client acknowledgements, then acks the pending messages one by one.
+
+    add() is called from the API dispatch thread and flushes inline once `batch`
+    messages are pending; a timer thread flushes whatever is pending every
+    `interval` seconds so no message waits indefinitely. Only the pending list and
+    the counters are touched under the lock, so add() never waits for a flush's acks.
+    """
+
+    def __init__(self, receiver, batch: int, interval: float):
+        self.receiver = receiver
+        self.batch = batch
+        self.interval = interval
+        self.pending = []
+        self.acked = 0
+        self.flushes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="deferred-acker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def add(self, message: InboundMessage):
+        with self.lock:
+            self.pending.append(message)
+            full = len(self.pending) >= self.batch
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            messages, self.pending = self.pending, []
+        if not messages:
+            return
+        acked = errors = 0
+        for message in messages:
+            try:
+                self.receiver.ack(message)
+                acked += 1
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"Ack failed: {e}")
+        # Both the dispatch and timer threads flush, so count under the lock
+        with self.lock:
+            self.acked += acked
+            self.errors += errors
+            self.flushes += 1
+
+
+class GuaranteedMessageHandler(MessageHandler):
+    def __init__(
+        self,
+        stats: StatsReporter,
+        acks: DeferredAcker = None,
+        expect: int = 0,
+        debug: bool = False,
+        latency: LatencyRecorder = None,
+    ):
+        self.stats = stats
+        self.latency = latency
+        self.acks = acks
+        self.expect = expect
+        self.debug = debug
+        self.done = threading.Event()
+        self.first_arrival = None
+        self.last_arrival = None
+
+    def on_message(self, message: InboundMessage):
+        # Runs on the API dispatch thread: count, queue the ack and return quickly
+        now = time.monotonic()
+        if self.first_arrival is None:
+            self.first_arrival = now
+        self.last_arrival = now
+        payload_bytes = message.get_payload_as_bytes()
+        self.stats.messages += 1
+        self.stats.bytes += len(payload_bytes) if payload_bytes else 0
+        if self.latency is not None:
+            self.latency.record(message)
+        if self.debug:
+            print(
+                f"Received message (ID: {message.get_application_message_id() or 'N/A'}, "
+                f"redelivered: {message.is_redelivered()}, {len(payload_bytes or b'')} bytes)"
+            )
+        if self.acks is not None:
+            self.acks.add(message)
+        if self.expect and self.stats.messages >= self.expect:
+            self.done.set()
+
+
+def main(
+    broker: str,
+    vpn: str,
+    username: str,
+    password: str,
+    queue: str,
+    exclusive: bool = True,
+    ack_mode: str = DEFAULT_ACK_MODE,
+    ack_batch: int = DEFAULT_ACK_BATCH,
+    ack_interval: float = DEFAULT_ACK_INTERVAL,
+    expect: int = 0,
+    duration: float = DEFAULT_DURATION,
+    stats_interval: float = DEFAULT_STATS_INTERVAL,
+    debug: bool = False,
+    latency: bool = False,
+):
+    # Log connection parameters
+    print(f"Using Solace host: {broker}")
+    print(f"Using VPN name: {vpn}")
+    print(f"Using username: {username}")
+    if ack_mode == "client":
+        print(f"Consuming from queue {queue} with client acks deferred to {ack_batch} pending or {ack_interval} sec")
+    else:
+        print(f"Consuming from queue {queue} with auto acks")
+
+    # Configure connection properties
+    properties = {
+        "solace.messaging.transport.host": broker,
+        "solace.messaging.service.vpn-name": vpn,
+        "solace.messaging.authentication.scheme.basic.username": username,
+        "solace.messaging.authentication.scheme.basic.password": password,
+    }
+
+    # Build and connect messaging service
+    messaging_service = MessagingService.builder().from_properties(properties).build()
+    receiver = None
+    acks = None
+    stats = StatsReporter("received", stats_interval)
+    handler = None
+    try:
+        messaging_service.connect()
+        print(f"Connected to Solace broker at {broker}")
+
+        # Create persistent receiver with the requested ack strategy
+        builder = messaging_service.create_persistent_message_receiver_builder()
+        if ack_mode == "client":
+            builder = builder.with_message_client_acknowledgement()
+        else:
+            builder = builder.with_message_auto_acknowledgement()
+        if exclusive:
+            receiver = builder.build(Queue.durable_exclusive_queue(queue))
+        else:
+            receiver = builder.build(Queue.durable_non_exclusive_queue(queue))
+
+        # Start receiver and attach handler
+        receiver.start()
+        print(f"Receiver started for queue {queue}")
+        if ack_mode == "client":
+            acks = DeferredAcker(receiver, ack_batch, ack_interval).start()
+        handler = GuaranteedMessageHandler(stats, acks, expect, debug, LatencyRecorder() if latency else None)
+        stats.start()
+        receiver.receive_async(handler)
+
+        # Run until --expect messages arrive, --duration elapses or interrupted
+        print("Running. Press Ctrl+C to stop.")
+        try:
+            if not handler.done.wait(duration):
+                print(f"Stopping after {duration} seconds")
+        except KeyboardInterrupt:
+            print("Stopping receiver...")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        print(f"Error details: {type(e).__name__}")
+        print("Suggestions:")
+        print("- Verify Solace broker is running and accessible")
+        print("- Ensure port 55555 (or 55443 for TLS) is open")
+        print("- Verify broker, VPN, username, password, and queue are correct")
+    finally:
+        # Stop delivery and ack everything already received before terminating, so
+        # the broker doesn't redeliver messages this run has processed
+        if receiver and receiver.is_running():
+            receiver.pause()
+        if acks is not None:
+            acks.stop()
+        if receiver:
+            receiver.terminate()
+        stats.stop()
+        print(f"Received {stats.messages} messages ({stats.bytes / 1024:.2f} KB)")
+        if handler is not None and handler.first_arrival is not None:
+            window = max(handler.last_arrival - handler.first_arrival, 1e-9)
+            print(
+                f"Drain throughput: {stats.messages / window:.2f} msgs/sec, "
+                f"{stats.bytes / window / (1024 * 1024):.2f} MB/sec "
+                f"over {window:.2f} seconds from first to last arrival"
+            )
+        if handler is not None and handler.latency is not None:
+            print(f"End-to-end latency: {handler.latency.latency.format()}")
+            print(f"Sequence: {handler.latency.sequences.format()} unstamped={handler.latency.unstamped}")
+        if acks is not None:
+            print(
+                f"Acked {acks.acked} messages in {acks.flushes} flush(es) "
+                f"(avg {acks.acked / max(acks.flushes, 1):.1f}), {acks.errors} ack errors"
+            )
+        messaging_service.disconnect()
+        print("Disconnected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solace Guaranteed Load Test Subscriber")
+    parser.add_argument(
+        "--broker",
+        type=str,
+        default=os.environ.get("SOLACE_HOST", DEFAULT_BROKER),
+        help="Broker host and port (e.g., tcp://<host>:55555 or tcps://<host>:55443 for TLS)",
+    )
+    parser.add_argument(
+        "--vpn",
+        type=str,
+        default=os.environ.get("SOLACE_VPN", DEFAULT_VPN),
+        help="Message VPN name (default: default)",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        default=os.environ.get("SOLACE_USERNAME", DEFAULT_USERNAME),
+        help="Broker username (default: default)",
+    )
+    parser.add_argument(
+        "--password",
+        type=str,
+        default=os.environ.get("SOLACE_PASSWORD", DEFAULT_PASSWORD),
+        help="Broker password (default: default)",
+    )
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=DEFAULT_QUEUE,
+        help="Durable queue to consume from (default: loadtest-queue)",
+    )
+    parser.add_argument(
+        "--non-exclusive",
+        action="store_true",
+        help="Bind to a non-exclusive queue (default: exclusive)",
+    )
+    parser.add_argument(
+        "--ack-mode",
+        type=str,
+        choices=["client", "auto"],
+        default=DEFAULT_ACK_MODE,
+        help="client: deferred explicit acks; auto: the API acks each message (default: client)",
+    )
+    parser.add_argument(
+        "--ack-batch",
+        type=int,
+        default=DEFAULT_ACK_BATCH,
+        help="Client mode: ack once this many messages are pending (default: 50)",
+    )
+    parser.add_argument(
+        "--ack-interval",
+        type=float,
+        default=DEFAULT_ACK_INTERVAL,
+        help="Client mode: also ack pending messages every N seconds (0 disables, default: 0.1)",
+    )
+    parser.add_argument(
+        "--expect",
+        type=int,
+        default=0,
+        help="Stop after receiving N messages (default: run for --duration)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=DEFAULT_DURATION,
+        help="Stop after N seconds (default: 3600)",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=DEFAULT_STATS_INTERVAL,
+        help="Seconds between throughput reports (0 to disable, default: 5)",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print every received message",
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Record latency and gaps/duplicates from publisher --latency user properties",
+    )
+    args = parser.parse_args()
+    main(
+        args.broker,
+        args.vpn,
+        args.username,
+        args.password,
+        args.queue,
+        not args.non_exclusive,
+        args.ack_mode,
+        max(1, args.ack_batch),
+        args.ack_interval,
+        args.expect,
+        args.duration,
+        args.stats_interval,
+        args.debug,
+        args.latency,
+    )
@@ -2,7 +2,10 @@ import os
 import logging
 from datetime import datetime
 import boto3
+import gzip
+import io
 import json
+import re
 from solace.messaging.messaging_service import (
     MessagingService,
     ReconnectionListener,
@@ -13,11 +16,62 @@ from solace.messaging.receiver.message_receiver import InboundMessage
 from solace.messaging.resources.queue import Queue
 from solace.messaging.receiver.persistent_message_receiver import PersistentMessageReceiver
 import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import orjson  # optional: faster parse/serialize when packaged with the Lambda
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard  # optional: S3_OUTPUT_FORMAT=ndjson.zst
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow  # optional: S3_OUTPUT_FORMAT=parquet
+    import pyarrow.json
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 
 # Set the environment variable LOG_LEVEL to 10 (= DEBUG) during development.
 log_level = int(os.getenv("LOG_LEVEL", logging.INFO))
 
+# S3 batching: a batch is written as one object once it holds this many messages or
+# bytes (uncompressed NDJSON), or its oldest message is this old. Keep S3_BATCH_MAX_MESSAGES below the
+# queue's "max delivered unacked msgs per flow", or the broker stops delivering first.
+S3_BATCH_MAX_MESSAGES = int(os.getenv("S3_BATCH_MAX_MESSAGES", 500))
+S3_BATCH_MAX_BYTES = int(os.getenv("S3_BATCH_MAX_BYTES", 8 * 1024 * 1024))
+S3_BATCH_MAX_AGE_SECONDS = float(os.getenv("S3_BATCH_MAX_AGE_SECONDS", 5))
+
+# Pipelined uploads (opt-in): with S3_UPLOAD_WORKERS > 0, batches are written by that
+# many threads while the receiver keeps pulling; the default 0 uploads inline. At most
+# S3_MAX_INFLIGHT_BATCHES batches are uploading at once; receiving waits for the oldest
+# when the window is full, which bounds memory. With pipelining,
+# (S3_MAX_INFLIGHT_BATCHES + 1) * S3_BATCH_MAX_MESSAGES messages can be unacked at once.
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", 0))
+S3_MAX_INFLIGHT_BATCHES = int(os.getenv("S3_MAX_INFLIGHT_BATCHES", 4))
+
+# How the header ids and the Survey and Localization Information subtree are pulled out
+# of a payload: "json" parses with the standard library, "orjson" parses with orjson.
+# "scan" still parses the whole document with the standard library, to route payloads
+# exactly as "json" does, and only skips re-serializing the subtree by copying its text
+# (unless it spans lines); that saves time only on compact payloads with a large
+# subtree. "auto" picks orjson when installed, otherwise json.
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+SUBTREE_KEY = "Survey and Localization Information"
+
+# Format of batch objects under landing/: "ndjson" (plain), "ndjson.gz" (gzip),
+# "ndjson.zst" (zstd, needs zstandard) or "parquet" (zstd-compressed columns with the
+# subtree as a nested struct, needs pyarrow). Error objects are always plain JSON.
+S3_OUTPUT_FORMAT = os.getenv("S3_OUTPUT_FORMAT", "ndjson")
+S3_COMPRESSION_LEVEL = int(os.getenv("S3_COMPRESSION_LEVEL", 3))
+OUTPUT_FORMATS = ("ndjson", "ndjson.gz", "ndjson.zst", "parquet")
+
 logging.basicConfig()
 logging.getLogger().setLevel(log_level)
 
@@ -36,6 +90,135 @@ class ServiceEventHandler(ReconnectionAttemptListener, ReconnectionListener, Ser
         logging.info(f"Message: {e.get_message()}")
 
 
+class S3BatchSink:
+    """Collects parsed messages into batch objects and acks them once the object is in S3.
+
+    Batches are NDJSON, written as S3_OUTPUT_FORMAT (optionally compressed, or Parquet).
+
+    A message is acknowledged only after the put_object holding it succeeds, so a failed
+    upload leaves the whole batch unacked on the queue for redelivery, as before.
+    Messages that fail to parse are still written one object each under error/.
+
+    With upload_workers, flushed batches are uploaded on a thread pool and the caller
+    carries on receiving. Acks stay on the receiving thread: release_acks() acks
+    finished batches in the order they were flushed, stopping at the oldest one still
+    uploading, and flush() waits for that oldest batch once max_inflight are uploading.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name,
+        batch_string,
+        receiver,
+        max_messages,
+        max_bytes,
+        max_age_seconds,
+        upload_workers=0,
+        max_inflight=1,
+        backend=JSON_BACKEND,
+        file_format=S3_OUTPUT_FORMAT,
+    ):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.batch_string = batch_string
+        self.receiver = receiver
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.lines = []
+        self.messages = []
+        self.size = 0
+        self.opened = None
+        self.batches = 0
+        self.acked = 0
+        self.backend = json_backend(backend)
+        self.output_format = output_format(file_format)
+        self.max_inflight = max(1, max_inflight)
+        self.inflight = deque()  # (future, messages, key) in flush order
+        self.executor = ThreadPoolExecutor(upload_workers, "s3-upload") if upload_workers > 0 else None
+
+    def add(self, message, message_number):
+        key, message_id, record_id, message_data, message_error = parse_message(
+            message, self.batch_string, message_number, self.backend
+        )
+        if message_error:
+            put_s3_object(self.s3_client, self.bucket_name, key, message_data)
+            self.ack([message])
+            return
+
+        line = ndjson_line(message_id, record_id, message_data, self.backend)
+        if self.lines and self.size + len(line) + 1 > self.max_bytes:
+            self.flush()
+        if not self.lines:
+            self.opened = time.time()
+        self.lines.append(line)
+        self.messages.append(message)
+        self.size += len(line) + 1
+        if len(self.lines) >= self.max_messages or self.size >= self.max_bytes:
+            self.flush()
+
+    def flush_if_due(self):
+        if self.lines and time.time() - self.opened >= self.max_age_seconds:
+            self.flush()
+        self.release_acks()
+
+    def flush(self):
+        if not self.lines:
+            return
+        lines, messages = self.lines, self.messages
+        self.lines, self.messages, self.size, self.opened = [], [], 0, None
+
+        self.batches += 1
+        file_obj_name = f"{landing_prefix(self.batch_string)}batch_{self.batches:05d}_{uuid.uuid4().hex[:8]}"
+        upload = (self.s3_client, self.bucket_name, file_obj_name, lines, self.output_format)
+        if self.executor is not None:
+            while len(self.inflight) >= self.max_inflight:
+                self.release_acks(wait=True)
+            # Encoding runs on the upload thread too, off the receive loop
+            future = self.executor.submit(upload_batch, *upload)
+        else:
+            future = Future()
+            try:
+                future.set_result(upload_batch(*upload))
+            except Exception as e:
+                future.set_exception(e)
+        self.inflight.append((future, messages, file_obj_name))
+        self.release_acks()
+
+    def release_acks(self, wait=False):
+        """Ack batches whose upload has finished, oldest first; with wait, block for the oldest."""
+        while self.inflight and (wait or self.inflight[0][0].done()):
+            future, messages, file_obj_name = self.inflight.popleft()
+            wait = False
+            try:
+                file_obj_name = future.result()
+            except Exception as e:
+                logging.error(
+                    f"[LAMBDA LOG] - Exception occurred uploading batch of {len(messages)} message(s) to s3, "
+                    f"leaving them unacknowledged: {e}"
+                )
+                continue
+            logging.info(f"[LAMBDA LOG] - Uploaded {len(messages)} message(s) to S3 with key: {file_obj_name}")
+            self.ack(messages)
+
+    def close(self):
+        """Flush the partial batch, wait for every upload and ack what succeeded."""
+        self.flush()
+        while self.inflight:
+            self.release_acks(wait=True)
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def ack(self, messages):
+        for message in messages:
+            try:
+                self.receiver.ack(message)
+                self.acked += 1  # messages successfully uploaded to s3 and removed from queue
+            except Exception as e:
+                logging.error(f"[LAMBDA LOG] - Exception occurred acknowledging message: {e}")
+
+
 # This method connects to Secrets Manager and gets secret.
 def get_sm_secret(secret_id):
     secrets = {}
@@ -104,9 +287,8 @@ def get_messages_from_queue(
 
     durable_queue = Queue.durable_exclusive_queue(solace_queue)
     direct_receiver = None
+    sink = None
     s3_client = boto3.client("s3")
-    message_number = 0
-    messages_processed = 0
 
     try:
         direct_receiver: PersistentMessageReceiver = (
@@ -119,44 +301,33 @@ def get_messages_from_queue(
         logging.info(f"[LAMBDA LOG] - Source queue: {durable_queue.get_name()}")
         bucket_name = os.getenv("BUCKET_NAME")
         logging.info(f"[LAMBDA LOG] - Target bucket: {bucket_name}")
+        sink = S3BatchSink(
+            s3_client,
+            bucket_name,
+            batch_string,
+            direct_receiver,
+            S3_BATCH_MAX_MESSAGES,
+            S3_BATCH_MAX_BYTES,
+            S3_BATCH_MAX_AGE_SECONDS,
+            S3_UPLOAD_WORKERS,
+            S3_MAX_INFLIGHT_BATCHES,
+        )
         logging.info(
-            f"[LAMBDA LOG] - Max pipeline run time: {max_runtime_seconds} second(s) ({round(max_runtime_seconds/60, 1)} minute(s))"
+            f"[LAMBDA LOG] - S3 batches: up to {S3_BATCH_MAX_MESSAGES} message(s), {S3_BATCH_MAX_BYTES} byte(s) "
+            f"or {S3_BATCH_MAX_AGE_SECONDS} second(s); {S3_UPLOAD_WORKERS} upload thread(s), "
+            f"{S3_MAX_INFLIGHT_BATCHES} batch(es) in flight, JSON backend: {sink.backend}, "
+            f"output format: {sink.output_format}"
         )
-
-        logging.info(f"[LAMBDA LOG] - Listening for new messages on queue...")
-        while True:
-            if (time.time() - start_time) > max_runtime_seconds:
-                logging.info(
-                    (f"[LAMBDA LOG] - Stopped listening for new messages (prevent data loss from Lambda timeout)")
-                )
-                break
-
-            try:
-                message: InboundMessage = direct_receiver.receive_message(10000)  # timeout in ms
-                if message != None:  # there was a message to receive
-                    message_number += 1
-                    logging.info(f"[LAMBDA LOG] - Received message #{message_number} from queue")
-                    try:
-                        upload_message_to_s3(bucket_name, message, s3_client, batch_string, message_number)
-                        try:
-                            direct_receiver.ack(message)
-                            messages_processed += 1  # messages successfully uploaded to s3 and removed from queue
-                        except Exception as e:
-                            logging.error(
-                                f"[LAMBDA LOG] - Exception occurred acknowledging message #{message_number}: {e}"
-                            )
-                    except Exception as e:
-                        logging.error(
-                            f"[LAMBDA LOG] - Exception occurred uploading message #{message_number} to s3: {e}"
-                        )
-
-            except Exception as e:
-                logging.error(f"[LAMBDA LOG] - Exception occurred getting message #{message_number} from queue: {e}")
+        drain_queue(direct_receiver, sink, start_time, max_runtime_seconds)
 
     except Exception as e:
-        logging.error(f"[LAMBDA LOG] - Exception occurred getting message #{message_number} from queue: {e}")
+        logging.error(f"[LAMBDA LOG] - Exception occurred getting messages from queue: {e}")
 
     finally:
+        # Write the partial batch, finish in-flight uploads and ack while the receiver can still acknowledge
+        if sink is not None:
+            sink.close()
+        messages_processed = sink.acked if sink is not None else 0
         logging.info(f"[LAMBDA LOG] - Total messages consumed during this pipeline run: {messages_processed}")
         logging.info(f"[LAMBDA LOG] - Runtime for this pipeline: {round((time.time() - start_time) / 60, 1)} minute(s)")
         if direct_receiver is not None:
@@ -166,52 +337,235 @@ def get_messages_from_queue(
         logging.info(f"[LAMBDA LOG] - Disconnected.")
 
 
-# This method processes payloads from the Solace Queue.
-def upload_message_to_s3(bucket_name, message, s3_client, batch_string, message_number):
-    message_error = False
-    message_data = ""
-    file_obj_name = ""
+# This method moves messages from the receiver to the sink until the run time is up.
+def drain_queue(receiver, sink, start_time, max_runtime_seconds, stop_when_idle=False):
+    """Receive loop of the pipeline, separate from the broker and S3 connections.
 
-    try:
-        data = message.get_payload_as_bytes().decode("utf-8")
-    except:
-        data = message.get_payload_as_bytes()
-        logging.error(f"[LAMBDA LOG] - Could not decode the message: {e}")
-        message_error = True
+    Takes anything with receive_message(timeout_ms) as the receiver and anything with
+    add/flush_if_due as the sink, so replay_harness.py can run it against a recorded
+    message file and an in-memory or local-filesystem S3. With stop_when_idle the loop
+    also ends the first time no message arrives. Returns the number of messages received.
+    """
+    max_runtime_seconds = float(max_runtime_seconds)  # env vars arrive as strings
+    message_number = 0
+    # Wake up often enough to flush a partial batch once it is due
+    receive_timeout_ms = int(min(10000, max(sink.max_age_seconds * 1000, 100)))
+    logging.info(
+        f"[LAMBDA LOG] - Max pipeline run time: {max_runtime_seconds} second(s) ({round(max_runtime_seconds/60, 1)} minute(s))"
+    )
+
+    logging.info(f"[LAMBDA LOG] - Listening for new messages on queue...")
+    while True:
+        if (time.time() - start_time) > max_runtime_seconds:
+            logging.info(
+                (f"[LAMBDA LOG] - Stopped listening for new messages (prevent data loss from Lambda timeout)")
+            )
+            break
 
+        try:
+            message: InboundMessage = receiver.receive_message(receive_timeout_ms)  # timeout in ms
+            if message != None:  # there was a message to receive
+                message_number += 1
+                logging.debug(f"[LAMBDA LOG] - Received message #{message_number} from queue")
+                try:
+                    sink.add(message, message_number)
+                except Exception as e:
+                    logging.error(f"[LAMBDA LOG] - Exception occurred uploading message #{message_number} to s3: {e}")
+            elif stop_when_idle:
+                break
+            sink.flush_if_due()
+
+        except Exception as e:
+            logging.error(f"[LAMBDA LOG] - Exception occurred getting message #{message_number} from queue: {e}")
+
+    return message_number
+
+
+# This method splits the batch string into date and time parts of the S3 path.
+def split_batch_string(batch_string):
     batch_string_date = batch_string.split("/")
     batch_string_timestamp = batch_string_date[-1]  # e.g. 152726
     batch_string_date = batch_string_date[:-1]
     batch_string_date = "".join(batch_string_date)  # e.g. 20231204
+    return batch_string_date, batch_string_timestamp
+
+
+# Subtree key located by scan_fields, and the colon that tells a key from an equal string value
+SUBTREE_KEY_TEXT = f'"{SUBTREE_KEY}"'
+KEY_SEPARATOR = re.compile(r"\s*:\s*")
+json_decoder = json.JSONDecoder()
+
+
+def json_backend(name=JSON_BACKEND):
+    if name == "auto":
+        return "orjson" if orjson is not None else "json"
+    if name == "orjson" and orjson is None:
+        raise ValueError("JSON_BACKEND=orjson but orjson is not installed")
+    if name not in ("scan", "orjson", "json"):
+        raise ValueError(f"Unknown JSON_BACKEND: {name}")
+    return name
+
+
+def dumps_bytes(value, backend):
+    if backend == "orjson":
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+# This method extracts the header ids and the serialized subtree from a payload.
+def extract_fields(payload, backend):
+    """Return (message_id, record_id, subtree JSON bytes); KeyError if a field is missing."""
+    if backend == "orjson":
+        data_dict = orjson.loads(payload)
+    else:
+        text = payload.decode("utf-8")
+        if backend == "scan":
+            fields = scan_fields(text)
+            if fields is not None:
+                return fields
+        data_dict = json.loads(text)
+    message_data = data_dict["RailTrackInspectionData"]["Data"][SUBTREE_KEY]
+    message_id = data_dict["RailTrackInspectionData"]["Headers"]["TransactionIdentity"]["MessageID"]
+    record_id = data_dict["RailTrackInspectionData"]["Headers"]["TransactionIdentity"]["RecordID"]
+    return message_id, record_id, dumps_bytes(message_data, backend)
+
+
+def scan_fields(text):
+    """Header ids and subtree text, or None to fall back to a full parse.
+
+    The subtree is decoded in place to find where it ends and its own text is copied
+    out, so it is never re-serialized. The rest of the document is then parsed with
+    the subtree swapped for a placeholder: that validates the whole payload and reads
+    the ids and the subtree's position from their real key paths, so a payload goes
+    to error/ exactly when the "json" backend would send it there. A subtree key
+    that is missing or occurs more than once is left to the full parse.
+    """
+    # A JSON string can't hold an unescaped quote, so this only matches whole keys or
+    # string values equal to the key; a second match of either kind falls back
+    position = text.find(SUBTREE_KEY_TEXT)
+    if position < 0 or text.find(SUBTREE_KEY_TEXT, position + 1) >= 0:
+        return None
+    separator = KEY_SEPARATOR.match(text, position + len(SUBTREE_KEY_TEXT))
+    if separator is None:
+        return None
+    message_data, end = json_decoder.raw_decode(text, separator.end())
+    subtree = text[separator.end() : end]
+
+    skeleton = json.loads(text[: separator.end()] + "0" + text[end:])
+    skeleton["RailTrackInspectionData"]["Data"][SUBTREE_KEY]  # KeyError if the subtree sits elsewhere
+    message_id = skeleton["RailTrackInspectionData"]["Headers"]["TransactionIdentity"]["MessageID"]
+    record_id = skeleton["RailTrackInspectionData"]["Headers"]["TransactionIdentity"]["RecordID"]
+    if "\n" in subtree:
+        # Pretty-printed: re-serialize just the subtree, as an NDJSON line can't hold line breaks
+        return message_id, record_id, dumps_bytes(message_data, "json")
+    return message_id, record_id, subtree.encode("utf-8")
+
+
+# This method gives the S3 prefix of this pipeline run's landing objects.
+def landing_prefix(batch_string):
+    batch_string_date, batch_string_timestamp = split_batch_string(batch_string)
+    return f"landing/{batch_string_date}/incremental/{batch_string_timestamp}/"
+
+
+def output_format(name=S3_OUTPUT_FORMAT):
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown S3_OUTPUT_FORMAT: {name}")
+    if name == "ndjson.zst" and zstandard is None:
+        raise ValueError("S3_OUTPUT_FORMAT=ndjson.zst but zstandard is not installed")
+    if name == "parquet" and pyarrow is None:
+        raise ValueError("S3_OUTPUT_FORMAT=parquet but pyarrow is not installed")
+    return name
+
+
+# This method encodes a batch of NDJSON lines as one object body in the output format.
+def encode_batch(lines, output_format, level=S3_COMPRESSION_LEVEL):
+    """Return (body, file extension) for the batch."""
+    body = b"\n".join(lines) + b"\n"
+    if output_format == "ndjson.gz":
+        return gzip.compress(body, compresslevel=level), ".ndjson.gz"
+    if output_format == "ndjson.zst":
+        return zstandard.ZstdCompressor(level=level).compress(body), ".ndjson.zst"
+    if output_format == "parquet":
+        # pyarrow infers the nested schema of the batch from the NDJSON itself
+        table = pyarrow.json.read_json(io.BytesIO(body))
+        output = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(table, output, compression="zstd", compression_level=level)
+        return output.getvalue().to_pybytes(), ".parquet"
+    return body, ".ndjson"
+
+
+# This method writes one batch to S3 and returns its key.
+def upload_batch(s3_client, bucket_name, file_obj_name, lines, output_format):
+    try:
+        body, extension = encode_batch(lines, output_format)
+    except Exception as e:
+        if output_format != "parquet":
+            raise
+        # Rows whose types conflict within a batch can't share a Parquet schema; keep
+        # the data (and the acks) moving as compressed NDJSON instead of redelivering
+        logging.error(f"[LAMBDA LOG] - Could not write batch as parquet, writing gzip NDJSON instead: {e}")
+        body, extension = encode_batch(lines, "ndjson.gz")
+    put_s3_object(s3_client, bucket_name, file_obj_name + extension, body)
+    return file_obj_name + extension
+
+
+# This method parses a payload from the Solace Queue into its S3 key and serialized data.
+def parse_message(message, batch_string, message_number, backend=None):
+    message_error = False
+    message_id = record_id = None
+    message_data = b""
+    file_obj_name = ""
+    backend = backend or json_backend()
+    payload = message.get_payload_as_bytes() or b""
+
+    batch_string_date, batch_string_timestamp = split_batch_string(batch_string)
 
     # build s3 obj path using message header details
-    if not message_error:
-        try:
-            data_dict = json.loads(data)
-            message_data = data_dict["RailTrackInspectionData"]["Data"]["Survey and Localization Information"]
-            message_id = data_dict["RailTrackInspectionData"]["Headers"]["TransactionIdentity"]["MessageID"]
-            record_id = data_dict["RailTrackInspectionData"]["Headers"]["TransactionIdentity"]["RecordID"]
-            file_obj_name = (
-                f"landing/{batch_string_date}/incremental/{batch_string_timestamp}/{message_id}_{record_id}.json"
-            )
-        except KeyError as e:
-            logging.error(f"[LAMBDA LOG] - Failed to extract key from message: {e}")
-            message_error = True
-        except Exception as e:
-            logging.error(f"[LAMBDA LOG] - Error parsing message header: {e}")
-            message_error = True
+    try:
+        message_id, record_id, message_data = extract_fields(payload, backend)
+        file_obj_name = f"{landing_prefix(batch_string)}{message_id}_{record_id}.json"
+    except UnicodeDecodeError as e:
+        logging.error(f"[LAMBDA LOG] - Could not decode the message: {e}")
+        message_error = True
+    except KeyError as e:
+        logging.error(f"[LAMBDA LOG] - Failed to extract key from message: {e}")
+        message_error = True
+    except Exception as e:
+        logging.error(f"[LAMBDA LOG] - Error parsing message header: {e}")
+        message_error = True
 
     # build path in case of error parsing message
     if message_error:
-        message_data = data
+        message_data = dumps_bytes(payload.decode("utf-8", "replace"), backend)
         file_obj_name = f"error/{batch_string_date}/incremental/{batch_string_timestamp}/{message_number}.json"
         logging.info(f"[LAMBDA LOG] - Uploading message to S3 with key: {file_obj_name}")
 
-    s3_client.put_object(
-        Body=json.dumps(message_data), Bucket=bucket_name, Key=file_obj_name, ServerSideEncryption="AES256"
+    return file_obj_name, message_id, record_id, message_data, message_error
+
+
+# Batched NDJSON lines keep the ids that the single-object key carried
+def ndjson_line(message_id, record_id, message_data, backend):
+    return (
+        b'{"MessageID": '
+        + dumps_bytes(message_id, backend)
+        + b', "RecordID": '
+        + dumps_bytes(record_id, backend)
+        + b', "Data": '
+        + message_data
+        + b"}"
     )
 
 
+def put_s3_object(s3_client, bucket_name, file_obj_name, body):
+    s3_client.put_object(Body=body, Bucket=bucket_name, Key=file_obj_name, ServerSideEncryption="AES256")
+
+
+# This method uploads a single payload from the Solace Queue as its own S3 object.
+def upload_message_to_s3(bucket_name, message, s3_client, batch_string, message_number):
+    file_obj_name, _, _, message_data, _ = parse_message(message, batch_string, message_number)
+    put_s3_object(s3_client, bucket_name, file_obj_name, message_data)
+
+
 def lambda_handler(event, context):
     """
     The variables below are passed from Airflow as strings to Lambda as events payload: